@@ -4,111 +4,357 @@ DjCap JSON Watcher and Metadata Processor
 Monitors djcap_output.json for changes and enriches metadata with Last.fm tags,
 keyword analysis, and GIFs.
 """
+import atexit
 import json
 import logging
+import mmap
+import queue
 import signal
 import sys
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Callable, Dict, Any, KeysView, Optional, List, Tuple
 import os
 import re
-from collections import deque
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import random
 import threading
+from functools import lru_cache
+import urllib.parse
+import urllib.request
 
 # #region agent log
 DEBUG_LOG_PATH = Path(__file__).parent / ".cursor" / "debug.log"
 PUBLIC_DEBUG_LOG_PATH = Path(__file__).parent / "data" / "output" / "debug_public.log"
+_DEBUG_LOG_QUEUE: deque = deque(maxlen=10000)  # pending entries; oldest dropped if the writer falls behind
+_DEBUG_LOG_EVENT = threading.Event()
+_DEBUG_LOG_DRAIN_LOCK = threading.Lock()
+_DEBUG_LOG_WRITER: Optional[threading.Thread] = None
+_DEBUG_LOG_STOP = False
+
+
 def _debug_log(location, message, data, hypothesis_id):
-    try:
-        DEBUG_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-        PUBLIC_DEBUG_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(DEBUG_LOG_PATH, 'a') as f:
-            log_entry = {
-                "sessionId": "debug-session",
-                "runId": "run1",
-                "hypothesisId": hypothesis_id,
-                "location": location,
-                "message": message,
-                "data": data,
-                "timestamp": int(time.time() * 1000)
-            }
-            f.write(json.dumps(log_entry) + "\n")
-        # Mirror to a non-protected path so the agent can clear it automatically
-        try:
-            with open(PUBLIC_DEBUG_LOG_PATH, 'a') as f2:
-                f2.write(json.dumps(log_entry) + "\n")
-        except:
-            pass
-    except: pass
+    """Queue a debug entry; a background thread appends queued entries to both logs in batches."""
+    global _DEBUG_LOG_WRITER
+    _DEBUG_LOG_QUEUE.append({
+        "sessionId": "debug-session",
+        "runId": "run1",
+        "hypothesisId": hypothesis_id,
+        "location": location,
+        "message": message,
+        "data": data,
+        "timestamp": int(time.time() * 1000)
+    })
+    if _DEBUG_LOG_WRITER is None:
+        with _DEBUG_LOG_DRAIN_LOCK:
+            if _DEBUG_LOG_WRITER is None:
+                _DEBUG_LOG_WRITER = threading.Thread(target=_debug_log_writer, name="djcap-debug-log", daemon=True)
+                _DEBUG_LOG_WRITER.start()
+    _DEBUG_LOG_EVENT.set()
+
+
+def _debug_log_writer():
+    # Sleeps until _debug_log or _stop_debug_log sets the event; no periodic wakeups when idle
+    while True:
+        _DEBUG_LOG_EVENT.wait()
+        _DEBUG_LOG_EVENT.clear()
+        _drain_debug_log()
+        if _DEBUG_LOG_STOP:
+            return
+
+
+def _drain_debug_log():
+    """Write all queued debug entries with one append per log file."""
+    with _DEBUG_LOG_DRAIN_LOCK:
+        lines = []
+        while _DEBUG_LOG_QUEUE:
+            entry = _DEBUG_LOG_QUEUE.popleft()
+            try:
+                lines.append(_json_dumps_bytes(entry))
+            except Exception:
+                pass
+        if not lines:
+            return
+        payload = b"\n".join(lines) + b"\n"
+        # The public copy is a non-protected mirror so the agent can clear it automatically;
+        # files are reopened per batch so a cleared/deleted log is recreated.
+        for path in (DEBUG_LOG_PATH, PUBLIC_DEBUG_LOG_PATH):
+            try:
+                try:
+                    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                except FileNotFoundError:
+                    # Log directory missing (first write, or cleared): create it once and retry
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, payload)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+
+
+def _stop_debug_log():
+    """Wake the writer so it exits, then flush anything still queued."""
+    global _DEBUG_LOG_STOP
+    _DEBUG_LOG_STOP = True
+    _DEBUG_LOG_EVENT.set()
+    writer = _DEBUG_LOG_WRITER
+    if writer is not None:
+        writer.join(timeout=1.0)
+    _drain_debug_log()
+
+
+atexit.register(_stop_debug_log)
+
+# Formatting full tracebacks for debug records is costly; opt in with DJCAP_DEBUG_VERBOSE=1
+_DEBUG_VERBOSE = os.getenv("DJCAP_DEBUG_VERBOSE", "0") == "1"
+
+
+def _debug_traceback() -> str:
+    """Tail of the current exception's traceback for a debug record ("" unless _DEBUG_VERBOSE)."""
+    if not _DEBUG_VERBOSE:
+        return ""
+    import traceback
+    return traceback.format_exc()[-1200:]
 # #endregion
 
 # Music video state (in-memory)
-_music_video_cache: Dict[str, Dict[str, Any]] = {}
+# Download outcomes per track_id, least recently used first; bounded so a long-running
+# session doesn't accumulate every track it has ever seen. An evicted "ready" track is
+# found again on disk by the download fast path.
+MUSIC_VIDEO_CACHE_MAX_ENTRIES = int(os.getenv("DJCAP_MV_CACHE", "2048"))
+_music_video_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
 _music_video_inflight: set = set()
+# Cached download outcomes that may be retried, and how long (seconds) to wait before retrying.
+# "empty" is often a missing yt-dlp install, so it is retried like "error".
+_RETRY_STATUSES = frozenset(("error", "empty"))
+_RETRY_BACKOFF: Dict[str, float] = {"error": 10.0, "empty": 10.0}
+# Guards the inflight set and the cache's LRU order; both decks may be processed concurrently
+_music_video_inflight_lock = threading.Lock()
+
+# Downloads run on a small fixed set of daemon workers: concurrency stays bounded, and
+# (unlike ThreadPoolExecutor workers, which are joined at exit) an in-progress yt-dlp
+# download never holds up shutdown.
+MUSIC_VIDEO_WORKERS = max(1, int(os.getenv("DJCAP_MV_WORKERS", "4")))
+_MV_JOBS: "queue.Queue[Callable[[], None]]" = queue.Queue()
+_MV_WORKER_THREADS: List[threading.Thread] = []
+
+
+def _store_music_video_entry(track_id: str, entry: Dict[str, Any]) -> None:
+    with _music_video_inflight_lock:
+        _music_video_cache[track_id] = entry
+        _music_video_cache.move_to_end(track_id)
+        while len(_music_video_cache) > MUSIC_VIDEO_CACHE_MAX_ENTRIES:
+            _music_video_cache.popitem(last=False)
+
+
+def _music_video_worker_loop():
+    while True:
+        job = _MV_JOBS.get()
+        try:
+            job()
+        except Exception as e:
+            logger.error(f"Music video worker error: {e}", exc_info=True)
+
+
+def _submit_music_video_job(job: Callable[[], None]) -> None:
+    """Queue a download job, starting the worker threads on first use."""
+    with _music_video_inflight_lock:
+        while len(_MV_WORKER_THREADS) < MUSIC_VIDEO_WORKERS:
+            t = threading.Thread(target=_music_video_worker_loop, name=f"djcap-mv-{len(_MV_WORKER_THREADS)}", daemon=True)
+            t.start()
+            _MV_WORKER_THREADS.append(t)
+    _MV_JOBS.put(job)
+
+
+# Filename stems are capped in UTF-8 bytes so yt-dlp's longest intermediate name
+# ("<stem>.f137.mp4.part") stays within the usual 255-byte filename limit.
+_MAX_STEM_BYTES = 240
+# Path separators and ":" are replaced in one pass
+_STEM_SANITIZE_TABLE = str.maketrans({"/": "_", "\\": "_", ":": "_"})
 
 
 def _sanitize_music_video_stem(artist: str, title: str) -> str:
-    stem = f"{artist} - {title}".strip()
-    return stem.replace("/", "_").replace("\\", "_").replace(":", "_")
+    stem = f"{artist} - {title}".strip().translate(_STEM_SANITIZE_TABLE)
+    encoded = stem.encode("utf-8")
+    if len(encoded) > _MAX_STEM_BYTES:
+        stem = encoded[:_MAX_STEM_BYTES].decode("utf-8", "ignore").rstrip()
+    return stem
+
+
+# Browser profile locations (macOS) in priority order: Chrome (most common), Safari, Firefox, ...
+# yt-dlp will handle the actual cookie extraction
+_BROWSER_PROFILE_DIRS: Tuple[Tuple[str, Path], ...] = tuple(
+    (browser, Path.home().joinpath(*parts))
+    for browser, parts in (
+        ('chrome', ("Library", "Application Support", "Google", "Chrome")),
+        ('safari', ("Library", "Safari")),  # Safari cookies are in a system location
+        ('firefox', ("Library", "Application Support", "Firefox")),
+        ('edge', ("Library", "Application Support", "Microsoft Edge")),
+        ('brave', ("Library", "Application Support", "BraveSoftware", "Brave-Browser")),
+        ('opera', ("Library", "Application Support", "com.operasoftware.Opera")),
+    )
+)
 
 
+@lru_cache(maxsize=1)
 def _get_cookies_from_browser() -> Optional[str]:
     """
     Try to find an available browser for cookie extraction.
     Returns browser name (e.g., 'chrome', 'safari', 'firefox') or None.
     yt-dlp will auto-detect the browser profile if available.
+    Cached for the process lifetime: installed browsers don't change between downloads.
     """
-    import shutil
-    import os
-    from pathlib import Path
-    
-    # Priority order: Chrome (most common), Safari, Firefox
-    # yt-dlp will handle the actual cookie extraction
-    browsers_to_try = ['chrome', 'safari', 'firefox', 'edge', 'brave', 'opera']
-    
-    for browser in browsers_to_try:
+    for browser, profile_dir in _BROWSER_PROFILE_DIRS:
         # Check if browser exists on the system
-        if browser == 'safari':
-            # Safari cookies are in a system location
-            safari_path = Path.home() / "Library" / "Safari"
-            if safari_path.exists():
-                return 'safari'
-        elif browser == 'chrome':
-            chrome_path = Path.home() / "Library" / "Application Support" / "Google" / "Chrome"
-            if chrome_path.exists():
-                return 'chrome'
-        elif browser == 'firefox':
-            firefox_path = Path.home() / "Library" / "Application Support" / "Firefox"
-            if firefox_path.exists():
-                return 'firefox'
-        elif browser == 'edge':
-            edge_path = Path.home() / "Library" / "Application Support" / "Microsoft Edge"
-            if edge_path.exists():
-                return 'edge'
-        elif browser == 'brave':
-            brave_path = Path.home() / "Library" / "Application Support" / "BraveSoftware" / "Brave-Browser"
-            if brave_path.exists():
-                return 'brave'
-        elif browser == 'opera':
-            opera_path = Path.home() / "Library" / "Application Support" / "com.operasoftware.Opera"
-            if opera_path.exists():
-                return 'opera'
+        if profile_dir.exists():
+            return browser
     
     # Fallback: try chrome (most common, yt-dlp will try to find it)
     # Even if path doesn't exist, yt-dlp might still be able to extract cookies
     return 'chrome'
 
 
+_YT_DLP_BIN: Optional[str] = None
+
+
+def _yt_dlp_bin() -> Optional[str]:
+    """
+    Locate the yt-dlp executable, remembering it once found.
+    A miss is not cached, so installing yt-dlp while running is picked up on the next retry.
+    """
+    global _YT_DLP_BIN
+    if _YT_DLP_BIN is None:
+        import shutil
+        _YT_DLP_BIN = shutil.which("yt-dlp") or shutil.which("yt_dlp")
+    return _YT_DLP_BIN
+
+
+def _run_keep_tail(cmd: List[str], tail_bytes: int = 4096):
+    """
+    Run `cmd` to completion like `subprocess.run(..., capture_output=True, text=True)`,
+    but keep only the last `tail_bytes` of stdout/stderr. yt-dlp can log a lot over a
+    long download and only the tail is ever inspected.
+    """
+    import subprocess as _subprocess
+
+    proc = _subprocess.Popen(cmd, stdout=_subprocess.PIPE, stderr=_subprocess.PIPE)
+    bufs = (bytearray(), bytearray())
+
+    def _drain(pipe, buf: bytearray) -> None:
+        with pipe:
+            for chunk in iter(lambda: pipe.read1(65536), b""):
+                buf += chunk
+                if len(buf) > 2 * tail_bytes:
+                    del buf[:-tail_bytes]
+
+    readers = [
+        threading.Thread(target=_drain, args=(pipe, buf), daemon=True)
+        for pipe, buf in zip((proc.stdout, proc.stderr), bufs)
+    ]
+    for reader in readers:
+        reader.start()
+    returncode = proc.wait()
+    for reader in readers:
+        reader.join()
+    stdout, stderr = (bytes(buf[-tail_bytes:]).decode("utf-8", "replace") for buf in bufs)
+    return _subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+
+
+# ffprobe codec results for downloaded videos, persisted next to them so a restart doesn't
+# re-probe every cached file: filename -> [st_mtime_ns, st_size, is_h264_avc1]
+_CODEC_CACHE_PATH = Path(__file__).parent / "data" / "music_videos" / ".codec_cache.json"
+_CODEC_CACHE: Optional[Dict[str, List[Any]]] = None
+_CODEC_CACHE_LOCK = threading.Lock()
+
+
+def _codec_cache() -> Dict[str, List[Any]]:
+    """Return the codec cache, loading it on first use. Caller holds _CODEC_CACHE_LOCK."""
+    global _CODEC_CACHE
+    if _CODEC_CACHE is None:
+        try:
+            loaded = _read_json_file(_CODEC_CACHE_PATH)
+        except (OSError, ValueError):
+            loaded = {}
+        if not isinstance(loaded, dict):
+            loaded = {}
+        # Skip entries for videos deleted while we weren't tracking them (the next record rewrites the file)
+        videos_dir = _CODEC_CACHE_PATH.parent
+        _CODEC_CACHE = {name: entry for name, entry in loaded.items() if (videos_dir / name).is_file()}
+    return _CODEC_CACHE
+
+
+def _record_codec_result(path: Path, is_h264_avc1: bool, st: Optional[os.stat_result] = None) -> None:
+    """Persist a codec determination for `path` (keyed by name, validated by mtime/size)."""
+    if st is None:
+        try:
+            st = path.stat()
+        except OSError:
+            return
+    with _CODEC_CACHE_LOCK:
+        cache = _codec_cache()
+        cache[path.name] = [st.st_mtime_ns, st.st_size, is_h264_avc1]
+        try:
+            _write_json_atomic(_CODEC_CACHE_PATH, cache)
+        except OSError as e:
+            logger.debug("Could not persist codec cache: %s", e)
+
+
+def _forget_codec_result(filename: str) -> None:
+    """Drop the codec entry for a deleted video so the sidecar doesn't accumulate stale names."""
+    with _CODEC_CACHE_LOCK:
+        cache = _codec_cache()
+        if cache.pop(filename, None) is None:
+            return
+        try:
+            _write_json_atomic(_CODEC_CACHE_PATH, cache)
+        except OSError as e:
+            logger.debug("Could not persist codec cache: %s", e)
+
+
+def _cached_codec_check(path: Path, probe: Callable[[Path], Optional[bool]]) -> Optional[bool]:
+    """
+    Return `probe(path)`, reusing the persisted result while the file's mtime and size match.
+    Undetermined results (None, e.g. no ffprobe) are not cached.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    with _CODEC_CACHE_LOCK:
+        entry = _codec_cache().get(path.name)
+    if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+        return entry[2]
+
+    result = probe(path)
+    if result is not None:
+        _record_codec_result(path, result, st)
+    return result
+
+
+# Prefer Safari-friendly H.264 (avc1) in MP4 when available.
+# This avoids common "black box" playback issues when yt-dlp picks AV1/VP9-in-MP4 formats.
+_YTDL_FMT = 'bv*[ext=mp4][vcodec^=avc1]+ba[ext=m4a]/b[ext=mp4][vcodec^=avc1]/b[ext=mp4]/b'
+# yt-dlp stderr markers of YouTube's bot check ("Sign in to confirm you're not a bot", cookies hints)
+_YTDL_BOT_RE = re.compile(r"bot|sign in|cookies", re.IGNORECASE)
+# ffprobe arguments (before the input path) that print the first video stream's codec as JSON
+_FFPROBE_CODEC_ARGS = (
+    "-v", "error",
+    "-select_streams", "v:0",
+    "-show_entries", "stream=codec_name,codec_tag_string",
+    "-of", "json",
+)
+
+
 def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str, Any]]:
     """
     Download a single merged MP4 for the track (equivalent to running yt-dlp in terminal).
     Returns dict with url/mime/title/filename for serving from frontend/server.py.
     """
     try:
-        import glob
         import sys as _sys
         import os as _os
         import time as _time
@@ -123,9 +369,6 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
         safe_stem = _sanitize_music_video_stem(artist or "", title or "")
         outtmpl = str(videos_dir / safe_stem) + ".%(ext)s"
 
-        # Prefer Safari-friendly H.264 (avc1) in MP4 when available.
-        # This avoids common "black box" playback issues when yt-dlp picks AV1/VP9-in-MP4 formats.
-        fmt = 'bv*[ext=mp4][vcodec^=avc1]+ba[ext=m4a]/b[ext=mp4][vcodec^=avc1]/b[ext=mp4]/b'
         query = f"{artist} {title} official music video".strip()
         search_query = f"ytsearch1:{query}"
 
@@ -139,18 +382,11 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
                 ffprobe = _shutil.which("ffprobe")
                 if not ffprobe:
                     return None
-                cmd = [
-                    ffprobe,
-                    "-v", "error",
-                    "-select_streams", "v:0",
-                    "-show_entries", "stream=codec_name,codec_tag_string",
-                    "-of", "json",
-                    str(path),
-                ]
-                r = _subprocess.run(cmd, capture_output=True, text=True, timeout=8)
+                r = _subprocess.run((ffprobe, *_FFPROBE_CODEC_ARGS, str(path)), capture_output=True, text=True, timeout=8)
                 if r.returncode != 0:
                     return None
-                info = json.loads(r.stdout or "{}")
+                raw = r.stdout or "{}"
+                info = _json_loads(raw)
                 streams = info.get("streams") or []
                 if not streams:
                     return None
@@ -167,14 +403,15 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
 
         # FAST PATH: if already downloaded, reuse it immediately
         existing_mp4 = videos_dir / f"{safe_stem}.mp4"
-        if existing_mp4.exists() and existing_mp4.is_file():
-            compat = _mp4_is_h264_avc1(existing_mp4)
+        if existing_mp4.is_file():
+            name = existing_mp4.name
+            compat = _cached_codec_check(existing_mp4, _mp4_is_h264_avc1)
             if compat is False:
                 # Known-incompatible codec for Safari; redownload with avc1 preference
                 _debug_log(
                     "djcap_processor.py:_download_music_video_full_mp4:cache",
                     "cache_incompatible_redownload",
-                    {"filename": existing_mp4.name, "size_bytes": existing_mp4.stat().st_size},
+                    {"filename": name},
                     "MV-FULL-CACHE",
                 )
                 try:
@@ -186,19 +423,30 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
                 _debug_log(
                     "djcap_processor.py:_download_music_video_full_mp4:cache",
                     "cache_hit",
-                    {"filename": existing_mp4.name, "size_bytes": existing_mp4.stat().st_size, "h264_avc1": compat},
+                    {"filename": name, "h264_avc1": compat},
                     "MV-FULL-CACHE",
                 )
             # #endregion
                 return {
                     "id": f"music_full_{existing_mp4.stem}",
-                    "url": f"/api/music_video/{_quote(existing_mp4.name)}",
+                    "url": f"/api/music_video/{_quote(name)}",
                     "title": f"{artist} - {title}",
                     "mime": "video/mp4",
-                    "filename": existing_mp4.name,
+                    "filename": name,
                 }
 
-        yt_dlp_bin = _shutil.which("yt-dlp") or _shutil.which("yt_dlp")
+        # Nothing below can succeed without yt-dlp; bail before any logging or setup
+        yt_dlp_bin = _yt_dlp_bin()
+        if not yt_dlp_bin:
+            # #region agent log
+            _debug_log(
+                "djcap_processor.py:_download_music_video_full_mp4",
+                "no_yt_dlp_binary",
+                {"path_head": (_os.environ.get("PATH") or "")[:180]},
+                "MV-FULL-Z",
+            )
+            # #endregion
+            return None
 
         # #region agent log
         _debug_log(
@@ -209,7 +457,7 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
                 "artist": artist,
                 "search_query": search_query,
                 "outtmpl": outtmpl,
-                "format": fmt,
+                "format": _YTDL_FMT,
                 "py_executable": getattr(_sys, "executable", None),
                 "cwd": _os.getcwd(),
                 "yt_dlp_bin": yt_dlp_bin,
@@ -218,25 +466,16 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
         )
         # #endregion
 
-        if not yt_dlp_bin:
-            # #region agent log
-            _debug_log(
-                "djcap_processor.py:_download_music_video_full_mp4",
-                "no_yt_dlp_binary",
-                {"path_head": (_os.environ.get("PATH") or "")[:180]},
-                "MV-FULL-Z",
-            )
-            # #endregion
-            return None
-
         # Add cookie support to bypass YouTube bot detection
         browser = _get_cookies_from_browser()
         cmd = [
             yt_dlp_bin,
-            "-f", fmt,
+            "-f", _YTDL_FMT,
             "--merge-output-format", "mp4",
             "--no-playlist",
             "-o", outtmpl,
+            # Report the downloaded video codec so a fresh file never needs an ffprobe check
+            "--print", "after_move:%(vcodec)s",
         ]
         
         # Add cookies if browser is available (helps bypass YouTube bot detection)
@@ -254,7 +493,7 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
         cmd.append(search_query)
 
         t0 = _time.time()
-        proc = _subprocess.run(cmd, capture_output=True, text=True)
+        proc = _run_keep_tail(cmd)
         t1 = _time.time()
 
         # #region agent log
@@ -274,8 +513,7 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
 
         if proc.returncode != 0:
             # Check if it's a bot detection error
-            stderr_lower = (proc.stderr or "").lower()
-            if "bot" in stderr_lower or "sign in" in stderr_lower or "cookies" in stderr_lower:
+            if _YTDL_BOT_RE.search(proc.stderr or ""):
                 # #region agent log
                 _debug_log(
                     "djcap_processor.py:_download_music_video_full_mp4:error",
@@ -291,17 +529,25 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
                 # #endregion
             return None
 
-        candidates = sorted(glob.glob(str(videos_dir / (safe_stem + ".*"))))
-        mp4 = next((c for c in candidates if c.lower().endswith(".mp4")), None)
-        chosen = mp4 or (candidates[-1] if candidates else None)
+        # --merge-output-format mp4 with our -o template normally yields exactly <stem>.mp4
+        if existing_mp4.is_file():
+            candidates = [existing_mp4.name]
+            chosen = existing_mp4.name
+        else:
+            # One directory pass with a plain prefix match (glob would treat "[...]" in titles as a pattern)
+            prefix = safe_stem + "."
+            with _os.scandir(videos_dir) as it:
+                candidates = sorted(entry.name for entry in it if entry.name.startswith(prefix))
+            mp4 = next((c for c in candidates if c.lower().endswith(".mp4")), None)
+            chosen = mp4 or (candidates[-1] if candidates else None)
 
         # #region agent log
         _debug_log(
             "djcap_processor.py:_download_music_video_full_mp4:download",
             "download_done",
             {
-                "candidates": [Path(c).name for c in candidates][-10:],
-                "chosen": Path(chosen).name if chosen else None,
+                "candidates": candidates[-10:],
+                "chosen": chosen,
             },
             "MV-FULL-C",
         )
@@ -310,21 +556,24 @@ def _download_music_video_full_mp4(title: str, artist: str) -> Optional[Dict[str
         if not chosen:
             return None
 
-        chosen_path = Path(chosen)
+        chosen_path = videos_dir / chosen
+        printed = (proc.stdout or "").strip().splitlines()
+        vcodec = printed[-1].strip().lower() if printed else ""
+        if vcodec and vcodec not in ("na", "none") and chosen_path.suffix.lower() == ".mp4":
+            _record_codec_result(chosen_path, vcodec.startswith("avc1") or vcodec == "h264")
         return {
             "id": f"music_full_{chosen_path.stem}",
-            "url": f"/api/music_video/{_quote(chosen_path.name)}",
+            "url": f"/api/music_video/{_quote(chosen)}",
             "title": f"{artist} - {title}",
             "mime": "video/mp4",
-            "filename": chosen_path.name,
+            "filename": chosen,
         }
     except Exception as e:
         # #region agent log
-        import traceback as _tb
         _debug_log(
             "djcap_processor.py:_download_music_video_full_mp4",
             "exception",
-            {"error_type": type(e).__name__, "error": str(e)[:300], "traceback": _tb.format_exc()[-1200:]},
+            {"error_type": type(e).__name__, "error": str(e)[:300], "traceback": _debug_traceback()},
             "MV-FULL-Z",
         )
         # #endregion
@@ -336,23 +585,6 @@ def _maybe_start_music_video_download(track_id: str, title: str, artist: str, bp
     Start a background yt-dlp download + precut for a track if we don't already have clips.
     Uses in-memory cache + inflight guard to avoid repeated downloads.
     """
-    # #region agent log
-    _debug_log(
-        "djcap_processor.py:_maybe_start_music_video_download",
-        "function_entry",
-        {
-            "track_id": track_id,
-            "title": title,
-            "artist": artist,
-            "bpm": bpm,
-            "has_track_id": bool(track_id),
-            "has_title": bool(title),
-            "has_artist": bool(artist),
-            "has_bpm": bool(bpm),
-        },
-        "MV-DEBUG-3",
-    )
-    # #endregion
     try:
         if not track_id or not title or not artist or not bpm:
             # #region agent log
@@ -365,80 +597,36 @@ def _maybe_start_music_video_download(track_id: str, title: str, artist: str, bp
             # #endregion
             return
 
-        # #region agent log
-        _debug_log(
-            "djcap_processor.py:_maybe_start_music_video_download",
-            "checking_cache",
-            {
-                "track_id": track_id,
-                "in_cache": track_id in _music_video_cache,
-                "in_inflight": track_id in _music_video_inflight,
-            },
-            "MV-DEBUG-4",
-        )
-        # #endregion
-        
-        if track_id in _music_video_cache:
-            cached = _music_video_cache.get(track_id) or {}
+        # Hot path: called on every processing run for both decks, and almost always
+        # for a track that is already cached, so this exits with one dict lookup.
+        cached = _music_video_cache.get(track_id)
+        if cached is not None:
+            with _music_video_inflight_lock:
+                if track_id in _music_video_cache:
+                    _music_video_cache.move_to_end(track_id)
+            status = cached["status"]
+            if status not in _RETRY_STATUSES:
+                return
             # Allow retry if we previously failed/emptied (e.g., missing yt-dlp module/binary)
-            status = cached.get("status")
-            downloaded_at = cached.get("downloaded_at") or 0
-            time_since_download = time.time() - float(downloaded_at or 0) if downloaded_at else 0
+            downloaded_at = cached.get("downloaded_at")
+            if not downloaded_at or time.time() - downloaded_at <= _RETRY_BACKOFF[status]:
+                return
+            with _music_video_inflight_lock:
+                _music_video_cache.pop(track_id, None)
             # #region agent log
             _debug_log(
                 "djcap_processor.py:_maybe_start_music_video_download",
-                "cache_check_details",
-                {
-                    "track_id": track_id,
-                    "status": status,
-                    "downloaded_at": downloaded_at,
-                    "time_since_download": time_since_download,
-                    "should_retry": status in {"error", "empty"} and time_since_download > 10,
-                },
-                "MV-DEBUG-5",
+                "retry_after_cached_failure",
+                {"track_id": track_id, "status": status, "downloaded_at": downloaded_at},
+                "MV-H",
             )
             # #endregion
-            # Retry if status is "error" or "empty" and it's been more than 10 seconds
-            # Also retry "empty" status immediately if it was from a missing module (likely yt_dlp wasn't installed)
-            should_retry = False
-            if status in {"error", "empty"}:
-                if time_since_download > 10:
-                    should_retry = True
-                elif status == "empty" and time_since_download > 0:
-                    # For "empty" status, retry after 30 seconds to allow time for yt_dlp installation
-                    should_retry = time_since_download > 30
-            
-            if should_retry:
-                try:
-                    _music_video_cache.pop(track_id, None)
-                except Exception:
-                    pass
-                # #region agent log
-                _debug_log(
-                    "djcap_processor.py:_maybe_start_music_video_download",
-                    "retry_after_cached_failure",
-                    {"track_id": track_id, "status": status, "downloaded_at": downloaded_at},
-                    "MV-H",
-                )
-                # #endregion
-            else:
-                # #region agent log
-                _debug_log(
-                    "djcap_processor.py:_maybe_start_music_video_download",
-                    "skip_cached",
-                    {
-                        "track_id": track_id,
-                        "status": status,
-                        "downloaded_at": downloaded_at,
-                        "clips_count": len(_music_video_cache.get(track_id, {}).get("clips") or []),
-                        "has_video": bool((_music_video_cache.get(track_id, {}) or {}).get("video")),
-                    },
-                    "MV-H",
-                )
-                # #endregion
-                return
 
-        if track_id in _music_video_inflight:
+        with _music_video_inflight_lock:
+            already_inflight = track_id in _music_video_inflight
+            if not already_inflight:
+                _music_video_inflight.add(track_id)
+        if already_inflight:
             # #region agent log
             _debug_log(
                 "djcap_processor.py:_maybe_start_music_video_download",
@@ -449,7 +637,6 @@ def _maybe_start_music_video_download(track_id: str, title: str, artist: str, bp
             # #endregion
             return
 
-        _music_video_inflight.add(track_id)
         started_at = time.time()
         # #region agent log
         _debug_log(
@@ -486,7 +673,7 @@ def _maybe_start_music_video_download(track_id: str, title: str, artist: str, bp
                     )
                     # #endregion
                     clips = _download_and_precut_music_video(title, artist, bpm)
-                    _music_video_cache[track_id] = {
+                    entry = {
                         "status": "ready" if clips else "empty",
                         "clips": clips,
                         "video": None,
@@ -503,36 +690,37 @@ def _maybe_start_music_video_download(track_id: str, title: str, artist: str, bp
                     )
                     # #endregion
                     video = _download_music_video_full_mp4(title, artist)
-                    _music_video_cache[track_id] = {
+                    entry = {
                         "status": "ready" if video else "empty",
                         "clips": [],
                         "video": video,
                         "downloaded_at": time.time(),
                         "started_at": started_at,
                     }
+                _store_music_video_entry(track_id, entry)
                 # #region agent log
                 _debug_log(
                     "djcap_processor.py:_maybe_start_music_video_download:worker",
                     "worker_done",
                     {
                         "track_id": track_id,
-                        "status": _music_video_cache[track_id]["status"],
-                        "clips_count": len(_music_video_cache[track_id].get("clips") or []),
-                        "has_video": bool(_music_video_cache[track_id].get("video")),
+                        "status": entry["status"],
+                        "clips_count": len(entry.get("clips") or []),
+                        "has_video": bool(entry.get("video")),
                         "elapsed_s": round(time.time() - started_at, 2),
                     },
                     "MV-I",
                 )
                 # #endregion
             except Exception as e:
-                _music_video_cache[track_id] = {
+                _store_music_video_entry(track_id, {
                     "status": "error",
                     "clips": [],
                     "video": None,
                     "downloaded_at": time.time(),
                     "started_at": started_at,
                     "error": str(e)[:300],
-                }
+                })
                 # #region agent log
                 _debug_log(
                     "djcap_processor.py:_maybe_start_music_video_download:worker",
@@ -558,7 +746,7 @@ def _maybe_start_music_video_download(track_id: str, title: str, artist: str, bp
             "MV-DEBUG-9",
         )
         # #endregion
-        threading.Thread(target=_worker, daemon=True).start()
+        _submit_music_video_job(_worker)
     except Exception as e:
         # #region agent log
         _debug_log(
@@ -590,6 +778,48 @@ except ImportError:
     # Ensure this name exists so the module can import/run without crashing.
     FileSystemEventHandler = object  # type: ignore[misc,assignment]
 
+try:
+    # Linux-only fallback watcher used when watchdog isn't installed
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+# orjson options for everything this module writes. Output is machine-read, so it's
+# written compact; the enriched djcap_output.json is indented only when DEBUG logging is enabled.
+_ORJSON_OUTPUT_OPTS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if ORJSON_AVAILABLE else 0
+
+
+def _json_loads(raw: Any) -> Any:
+    """Parse JSON from str/bytes (or any buffer, with orjson); orjson when installed."""
+    return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+
+
+def _json_dumps_bytes(obj: Any, pretty: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, compact unless `pretty`; orjson when installed."""
+    if ORJSON_AVAILABLE:
+        opts = (_ORJSON_OUTPUT_OPTS | orjson.OPT_INDENT_2) if pretty else _ORJSON_OUTPUT_OPTS
+        return orjson.dumps(obj, option=opts)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+# fsync the temp file and its directory around the rename so a crash can't leave a
+# truncated djcap_output.json behind. Off by default: it costs a disk flush per write.
+DURABLE_WRITES = os.getenv("DJCAP_DURABLE_WRITES", "0") == "1"
+
 # Import AudioApis metadata modules
 try:
     from metadata.lastfm_client import get_lastfm_tags
@@ -600,6 +830,64 @@ except ImportError as e:
     METADATA_MODULES_AVAILABLE = False
     logging.warning(f"AudioApis metadata modules not available: {e}")
 
+
+@lru_cache(maxsize=256)
+def _lastfm_tags_cached(artist: str, title: str) -> Tuple[str, ...]:
+    """Last.fm tags for a track, cached for the session (tracks recur across a set)."""
+    return tuple(get_lastfm_tags(artist, title))
+
+# Search API endpoints
+_GIPHY_SEARCH_URL = "https://api.giphy.com/v1/gifs/search"
+_GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+# Keep-alive session so repeat API calls reuse the TCP/TLS connection
+if REQUESTS_AVAILABLE:
+    _HTTP = requests.Session()
+    _HTTP.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+
+class _RateLimiter:
+    """Token bucket: up to `burst` calls at once, refilled at `rate_per_s`; acquire() blocks for a token."""
+
+    def __init__(self, rate_per_s: float, burst: int):
+        self._rate = rate_per_s
+        self._burst = float(burst)
+        self._tokens = float(burst)
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._t) * self._rate)
+            self._t = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            # Wait out the deficit while holding the lock so callers are served in turn
+            wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+            self._tokens = 0.0
+            self._t = now + wait
+
+
+# Short-term pacing per API, on top of the hourly Giphy budget (_giphy_can_request),
+# so a burst of track changes doesn't hit per-IP limits
+_GIPHY_RL = _RateLimiter(5, 10)
+_GOOGLE_RL = _RateLimiter(2, 4)
+
+
+def _http_get_json(url: str, params: Dict[str, Any], timeout: float = 10) -> Any:
+    """GET a JSON API endpoint (pooled session when requests is installed, else urllib)."""
+    if REQUESTS_AVAILABLE:
+        response = _HTTP.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        raw = response.content
+    else:
+        with urllib.request.urlopen(f"{url}?{urllib.parse.urlencode(params)}", timeout=timeout) as response:
+            raw = response.read()
+    return _json_loads(raw)
+
 # Direct Google Custom Search API implementation for GIFs
 def _fetch_gifs_from_google(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     """
@@ -618,11 +906,6 @@ def _fetch_gifs_from_google(query: str, limit: int = 5) -> List[Dict[str, Any]]:
         return []
     
     try:
-        import urllib.request
-        import urllib.parse
-        
-        # Google Custom Search API endpoint
-        base_url = "https://www.googleapis.com/customsearch/v1"
         params = {
             "q": query,
             "cx": GOOGLE_CSE_ID,
@@ -633,14 +916,12 @@ def _fetch_gifs_from_google(query: str, limit: int = 5) -> List[Dict[str, Any]]:
             "safe": "active"  # Safe search
         }
         
-        url = f"{base_url}?{urllib.parse.urlencode(params)}"
-        
         # #region agent log
-        _debug_log("djcap_processor.py:_fetch_gifs_from_google", "Fetching from Google API", {"query": query, "limit": limit, "url": url.replace(GOOGLE_API_KEY, "***").replace(GOOGLE_CSE_ID, "***")}, "J")
+        _debug_log("djcap_processor.py:_fetch_gifs_from_google", "Fetching from Google API", {"query": query, "limit": limit}, "J")
         # #endregion
         
-        with urllib.request.urlopen(url, timeout=10) as response:
-            data = json.loads(response.read().decode())
+        _GOOGLE_RL.acquire()
+        data = _http_get_json(_GOOGLE_SEARCH_URL, params)
             
         gifs = []
         items = data.get("items", [])
@@ -675,6 +956,10 @@ def _fetch_gifs_from_google(query: str, limit: int = 5) -> List[Dict[str, Any]]:
         logger.warning(f"Error fetching GIFs from Google: {e}")
         return []
 
+# Shared read-only fallback for nested `.get()` lookups (never mutate).
+_EMPTY: Dict[str, Any] = {}
+
+
 # Direct Giphy API implementation (fallback when AudioApis not available)
 def _fetch_gifs_direct(query: str, limit: int = 25) -> List[Dict[str, Any]]:
     """
@@ -693,11 +978,6 @@ def _fetch_gifs_direct(query: str, limit: int = 25) -> List[Dict[str, Any]]:
         return []
     
     try:
-        import urllib.request
-        import urllib.parse
-        
-        # Giphy Search API endpoint
-        base_url = "https://api.giphy.com/v1/gifs/search"
         params = {
             "api_key": GIPHY_API_KEY,
             "q": query,
@@ -706,26 +986,27 @@ def _fetch_gifs_direct(query: str, limit: int = 25) -> List[Dict[str, Any]]:
             "lang": "en"
         }
         
-        url = f"{base_url}?{urllib.parse.urlencode(params)}"
-        
         # #region agent log
-        _debug_log("djcap_processor.py:_fetch_gifs_direct", "Fetching from Giphy API", {"query": query, "limit": limit, "url": url.replace(GIPHY_API_KEY, "***")}, "J")
+        _debug_log("djcap_processor.py:_fetch_gifs_direct", "Fetching from Giphy API", {"query": query, "limit": limit}, "J")
         # #endregion
         
-        with urllib.request.urlopen(url, timeout=10) as response:
-            data = json.loads(response.read().decode())
+        _GIPHY_RL.acquire()
+        data = _http_get_json(_GIPHY_SEARCH_URL, params)
             
         gifs = []
         if data.get("data"):
             for item in data["data"]:
+                images = item.get("images") or _EMPTY
+                ds = images.get("downsized") or _EMPTY
+                fh = images.get("fixed_height") or _EMPTY
                 gif = {
                     "id": item.get("id"),
-                    "url": item.get("images", {}).get("downsized", {}).get("url") or item.get("images", {}).get("fixed_height", {}).get("url") or "",
+                    "url": ds.get("url") or fh.get("url") or "",
                     "title": item.get("title", ""),
                     "rating": item.get("rating", "g"),
                     "source": item.get("source", ""),
-                    "width": item.get("images", {}).get("downsized", {}).get("width") or item.get("images", {}).get("fixed_height", {}).get("width") or 480,
-                    "height": item.get("images", {}).get("downsized", {}).get("height") or item.get("images", {}).get("fixed_height", {}).get("height") or 270,
+                    "width": ds.get("width") or fh.get("width") or 480,
+                    "height": ds.get("height") or fh.get("height") or 270,
                     "tags": item.get("tags", [])
                 }
                 if gif["url"]:  # Only add if we have a valid URL
@@ -776,8 +1057,48 @@ GIPHY_HISTORY_PATH = Path(__file__).resolve().parent / "data" / "output" / "giph
 GIPHY_HISTORY_MAX_IDS_PER_ARTIST = int(os.getenv("GIPHY_HISTORY_MAX_IDS_PER_ARTIST", "200"))
 GIPHY_HISTORY_MAX_IDS_PER_ARTIST = max(20, min(2000, GIPHY_HISTORY_MAX_IDS_PER_ARTIST))
 
+
+class _GifHistoryRing:
+    """Fixed-capacity ring of recently used GIF IDs for one artist."""
+    __slots__ = ("capacity", "ids", "inserted", "_counts")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ids: List[str] = []
+        self.inserted = 0  # total inserts; once full, the next write goes to inserted % capacity
+        # Occurrences of each ID in `ids`, kept in step with every insert/evict so membership
+        # checks never rebuild a set (the ring may hold the same ID more than once).
+        self._counts: Dict[str, int] = {}
+
+    def add(self, gid: str) -> None:
+        counts = self._counts
+        if len(self.ids) < self.capacity:
+            self.ids.append(gid)
+        else:
+            slot = self.inserted % self.capacity
+            old = self.ids[slot]
+            if counts[old] == 1:
+                del counts[old]
+            else:
+                counts[old] -= 1
+            self.ids[slot] = gid
+        counts[gid] = counts.get(gid, 0) + 1
+        self.inserted += 1
+
+    def members(self) -> KeysView[str]:
+        """Live view of the IDs currently in the ring."""
+        return self._counts.keys()
+
+    def ordered(self) -> List[str]:
+        """IDs oldest first (the persisted order)."""
+        if len(self.ids) < self.capacity:
+            return list(self.ids)
+        k = self.inserted % self.capacity
+        return self.ids[k:] + self.ids[:k]
+
+
 _GIPHY_HISTORY_LOADED = False
-_GIPHY_HISTORY: Dict[str, deque] = {}
+_GIPHY_HISTORY: Dict[str, _GifHistoryRing] = {}
 
 # Hard cap: maximum number of live Giphy requests per rolling hour.
 # Persisted to disk so restarts don't reset the quota usage.
@@ -785,88 +1106,177 @@ GIPHY_MAX_REQUESTS_PER_HOUR = int(os.getenv("GIPHY_MAX_REQUESTS_PER_HOUR", "40")
 GIPHY_RATE_STATE_PATH = Path(__file__).resolve().parent / "data" / "output" / "giphy_rate_state.json"
 
 _GIPHY_RATE_LOADED = False
-_GIPHY_RATE_TS = deque()
+# Rolling hour as a fixed wheel of one-minute slots: slot m % 60 holds (m, count) for
+# minute m of time.monotonic(), and a slot whose minute has left the window is simply
+# stale, so nothing ever needs pruning. Minutes are converted to wall-clock minutes
+# only when persisted, since that is what stays meaningful across restarts.
+_GIPHY_WINDOW_MINUTES = 60
+_GIPHY_EMPTY_SLOT = (-(1 << 62), 0)  # older than any minute (restored ones may be negative)
+_GIPHY_RATE_BUCKETS: List[Tuple[int, int]] = [_GIPHY_EMPTY_SLOT] * _GIPHY_WINDOW_MINUTES
+
+# Rate state and GIF history are persisted by a coalescing flusher: updates mark the
+# file dirty and a single timer writes everything pending GIPHY_STATE_FLUSH_DELAY later
+# (plus a final flush on shutdown).
+GIPHY_STATE_FLUSH_DELAY = 0.5
+_GIPHY_DIRTY: set = set()
+_GIPHY_FLUSH_LOCK = threading.Lock()
+_GIPHY_FLUSH_TIMER: Optional[threading.Timer] = None
+
+
+def _mark_dirty(kind: str) -> None:
+    """Schedule a write of the "rate" or "history" state file."""
+    global _GIPHY_FLUSH_TIMER
+    with _GIPHY_FLUSH_LOCK:
+        _GIPHY_DIRTY.add(kind)
+        if _GIPHY_FLUSH_TIMER is None:
+            _GIPHY_FLUSH_TIMER = threading.Timer(GIPHY_STATE_FLUSH_DELAY, _flush_now)
+            _GIPHY_FLUSH_TIMER.daemon = True
+            _GIPHY_FLUSH_TIMER.start()
+
+
+def _flush_now() -> None:
+    """Write every dirty Giphy state file immediately."""
+    global _GIPHY_FLUSH_TIMER
+    with _GIPHY_FLUSH_LOCK:
+        dirty = set(_GIPHY_DIRTY)
+        _GIPHY_DIRTY.clear()
+        if _GIPHY_FLUSH_TIMER is not None:
+            _GIPHY_FLUSH_TIMER.cancel()
+            _GIPHY_FLUSH_TIMER = None
+    writers = {"rate": _write_giphy_rate_state, "history": _write_giphy_history}
+    for kind in dirty:
+        # A failed write is not retried: the next record/save marks the file dirty again
+        writers[kind]()
+
+
+def _write_json_atomic(path: Path, obj: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    # Machine-read state: written compact (inspect with `python -m json.tool`)
+    _write_file_bytes(temp_file, _json_dumps_bytes(obj), fsync=DURABLE_WRITES)
+    os.replace(temp_file, path)
+    if DURABLE_WRITES:
+        _fsync_dir(str(path.parent))
+
+
+def _read_json_file(path: Path) -> Any:
+    return _json_loads(path.read_bytes())
+
+
+def _wall_clock_offset() -> float:
+    """Offset to convert between time.monotonic() and time.time()."""
+    return time.time() - time.monotonic()
+
+
+def _wheel_add(wheel: List[Tuple[int, int]], minute: int, n: int) -> None:
+    """Add n requests to `minute`, reclaiming its slot if it still holds an older minute."""
+    slot = minute % _GIPHY_WINDOW_MINUTES
+    idx, count = wheel[slot]
+    if idx == minute:
+        wheel[slot] = (minute, count + n)
+    elif idx < minute:
+        wheel[slot] = (minute, n)
 
 
 def _ensure_giphy_rate_loaded() -> None:
-    """Load persisted request timestamps once (best-effort)."""
-    global _GIPHY_RATE_LOADED, _GIPHY_RATE_TS
+    """Load persisted per-minute request counts once (best-effort)."""
+    global _GIPHY_RATE_LOADED, _GIPHY_RATE_BUCKETS
     if _GIPHY_RATE_LOADED:
         return
+    buckets: Dict[int, int] = {}
     try:
         if GIPHY_RATE_STATE_PATH.exists():
-            data = json.loads(GIPHY_RATE_STATE_PATH.read_text())
-            ts = data.get("timestamps", [])
-            parsed = []
-            for t in ts:
-                if isinstance(t, (int, float)):
-                    parsed.append(float(t))
-                elif isinstance(t, str):
-                    try:
-                        parsed.append(float(t))
-                    except Exception:
-                        pass
-            parsed.sort()
-            _GIPHY_RATE_TS = deque(parsed)
+            data = _read_json_file(GIPHY_RATE_STATE_PATH)
+            offset = _wall_clock_offset()
+            if "buckets" in data:
+                for minute, count in data["buckets"].items():
+                    b = int((int(minute) * 60 - offset) // 60)
+                    buckets[b] = buckets.get(b, 0) + int(count)
+            else:
+                # Older files store the raw request timestamps
+                for t in data.get("timestamps", []):
+                    b = int((float(t) - offset) // 60)
+                    buckets[b] = buckets.get(b, 0) + 1
     except Exception:
-        _GIPHY_RATE_TS = deque()
+        buckets = {}
+    wheel = [_GIPHY_EMPTY_SLOT] * _GIPHY_WINDOW_MINUTES
+    for b, count in buckets.items():
+        _wheel_add(wheel, b, count)
+    _GIPHY_RATE_BUCKETS = wheel
     _GIPHY_RATE_LOADED = True
 
 
-def _giphy_prune(now: float) -> None:
-    """Drop timestamps older than 1 hour."""
-    cutoff = now - 3600.0
-    while _GIPHY_RATE_TS and _GIPHY_RATE_TS[0] < cutoff:
-        _GIPHY_RATE_TS.popleft()
+def _giphy_live_buckets(current: int) -> List[Tuple[int, int]]:
+    """(minute, count) slots that fall inside the rolling hour ending at `current`."""
+    oldest = current - _GIPHY_WINDOW_MINUTES
+    return [(idx, c) for idx, c in _GIPHY_RATE_BUCKETS if idx > oldest and c]
 
 
 def _giphy_can_request(cost: int = 1) -> bool:
     _ensure_giphy_rate_loaded()
-    now = time.time()
-    _giphy_prune(now)
-    return (len(_GIPHY_RATE_TS) + cost) <= GIPHY_MAX_REQUESTS_PER_HOUR
+    used = sum(c for _, c in _giphy_live_buckets(int(time.monotonic() // 60)))
+    return (used + cost) <= GIPHY_MAX_REQUESTS_PER_HOUR
 
 
 def _giphy_record_request(cost: int = 1) -> None:
     _ensure_giphy_rate_loaded()
-    now = time.time()
-    _giphy_prune(now)
-    for _ in range(max(1, cost)):
-        _GIPHY_RATE_TS.append(now)
+    _wheel_add(_GIPHY_RATE_BUCKETS, int(time.monotonic() // 60), max(1, cost))
+    _mark_dirty("rate")
+
+
+def _write_giphy_rate_state() -> None:
+    """Write rate-limit counters to disk (best-effort)."""
     try:
-        GIPHY_RATE_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        GIPHY_RATE_STATE_PATH.write_text(json.dumps({"timestamps": list(_GIPHY_RATE_TS)}, indent=2))
-    except Exception:
+        offset = _wall_clock_offset()
+        live = _giphy_live_buckets(int(time.monotonic() // 60))
+        buckets = {str(int((b * 60 + offset) // 60)): c for b, c in live}
+        _write_json_atomic(GIPHY_RATE_STATE_PATH, {"buckets": buckets, "sum": sum(c for _, c in live)})
+    except Exception as e:
         # Best effort only: don't fail enrichment if persistence fails
-        pass
+        logger.warning(f"Could not write Giphy rate state: {e}")
 
 
+_RE_PAREN = re.compile(r"\s*\([^)]*\)")  # parentheticals, e.g. "(Radio Edit)"
+_RE_FEAT = re.compile(r"\s+feat\.?.*$", re.IGNORECASE)
+_RE_FT = re.compile(r"\s+ft\.?.*$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=128)
 def _clean_title_for_giphy(title: Optional[str]) -> Optional[str]:
     """Normalize a track title for use in the Giphy query."""
     if not title:
         return None
-    cleaned = str(title)
-    cleaned = re.sub(r"\s*\([^)]*\)", "", cleaned)  # remove parentheticals
-    cleaned = re.sub(r"\s+feat\.?.*$", "", cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r"\s+ft\.?.*$", "", cleaned, flags=re.IGNORECASE)
+    cleaned = _RE_FT.sub("", _RE_FEAT.sub("", _RE_PAREN.sub("", str(title))))
     cleaned = cleaned.strip()
     return cleaned or None
 
 
-def _build_giphy_query_parts(title: Optional[str], artist: Optional[str]) -> List[str]:
+def _build_giphy_query_parts(title: Optional[str], artist: Optional[str]) -> Tuple[str, ...]:
     """
-    Build the Giphy search "keywords" list.
+    Build the Giphy search "keywords" tuple.
     
     Policy: artist-only search (no title) to keep results broad and consistent.
+    Parts are interned so repeated comparisons against the same artist are cheap.
     """
     if not artist:
-        return []
+        return ()
     a = str(artist).strip()
-    return [a] if a else []
+    return (sys.intern(a),) if a else ()
+
+
+def _query_parts_match(qp: List[Any], parts: Tuple[str, ...], exact: bool = False) -> bool:
+    """Compare stored (JSON list) query parts against a parts tuple without slicing."""
+    n = len(parts)
+    if len(qp) < n or (exact and len(qp) != n):
+        return False
+    for i in range(n):
+        if qp[i] != parts[i]:
+            return False
+    return True
 
 
 def _normalize_artist_key(artist: Optional[str]) -> str:
-    return (str(artist).strip().lower() if artist else "").strip()
+    return str(artist).strip().lower() if artist else ""
 
 
 def _ensure_giphy_history_loaded() -> None:
@@ -877,94 +1287,97 @@ def _ensure_giphy_history_loaded() -> None:
     _GIPHY_HISTORY = {}
     try:
         if GIPHY_HISTORY_PATH.exists():
-            data = json.loads(GIPHY_HISTORY_PATH.read_text())
+            data = _read_json_file(GIPHY_HISTORY_PATH)
             if isinstance(data, dict):
                 for k, ids in data.items():
                     if not isinstance(k, str) or not isinstance(ids, list):
                         continue
-                    cleaned = [str(x) for x in ids if x]
-                    _GIPHY_HISTORY[k] = deque(cleaned[-GIPHY_HISTORY_MAX_IDS_PER_ARTIST:])
+                    ring = _GifHistoryRing(GIPHY_HISTORY_MAX_IDS_PER_ARTIST)
+                    for x in ids[-GIPHY_HISTORY_MAX_IDS_PER_ARTIST:]:
+                        if x:
+                            ring.add(str(x))
+                    _GIPHY_HISTORY[k] = ring
     except Exception:
         _GIPHY_HISTORY = {}
     _GIPHY_HISTORY_LOADED = True
 
 
 def _save_giphy_history() -> None:
+    _mark_dirty("history")
+
+
+def _write_giphy_history() -> None:
+    """Write per-artist GIF history to disk (best-effort)."""
     try:
-        GIPHY_HISTORY_PATH.parent.mkdir(parents=True, exist_ok=True)
-        payload = {k: list(v) for k, v in _GIPHY_HISTORY.items()}
-        GIPHY_HISTORY_PATH.write_text(json.dumps(payload, indent=2))
-    except Exception:
-        pass
+        payload = {k: v.ordered() for k, v in list(_GIPHY_HISTORY.items())}
+        _write_json_atomic(GIPHY_HISTORY_PATH, payload)
+    except Exception as e:
+        logger.warning(f"Could not write Giphy history: {e}")
+
+
+atexit.register(_flush_now)
+
+
+def _gid(g: Dict[str, Any], _get=dict.get) -> str:
+    """Identity of a GIF for de-duping and history: its id, else its url ("" if neither)."""
+    return _get(g, "id") or _get(g, "url") or ""
 
 
 def _filter_and_select_gifs_for_artist(
-    artist: Optional[str],
+    artist_key: str,
     gifs: List[Dict[str, Any]],
     max_count: int = GIPHY_GIFS_PER_TRACK,
 ) -> List[Dict[str, Any]]:
     """
     Prefer GIFs not recently used for the same artist.
+    `artist_key` is the caller's `_normalize_artist_key(artist)` ("" disables history).
     Returns <= max_count (defaults to GIPHY_GIFS_PER_TRACK) and records selections to history.
     """
     if not gifs:
         return []
 
     _ensure_giphy_history_loaded()
-    artist_key = _normalize_artist_key(artist)
-    used_ids = set(_GIPHY_HISTORY.get(artist_key, deque())) if artist_key else set()
+    ring = _GIPHY_HISTORY.get(artist_key) if artist_key else None
+    used_ids = ring.members() if ring is not None else frozenset()
 
     # De-dupe within this batch first
-    seen = set()
-    unique: List[Dict[str, Any]] = []
-    for g in gifs:
-        gid = g.get("id") or g.get("url") or ""
-        if not gid or gid in seen:
-            continue
-        seen.add(gid)
-        unique.append(g)
-
-    # Shuffle so we don't always pick the same "top" items
-    random.shuffle(unique)
+    unique = _dedupe_gif_list(gifs)
 
     fresh: List[Dict[str, Any]] = []
     fallback: List[Dict[str, Any]] = []
     for g in unique:
-        gid = g.get("id") or g.get("url") or ""
+        gid = _gid(g)
         if artist_key and gid in used_ids:
             fallback.append(g)
         else:
             fresh.append(g)
 
-    selected = (fresh + fallback)[:max_count]
+    # Random picks so we don't always use the same "top" items; only draw what's needed
+    selected = random.sample(fresh, min(len(fresh), max_count))
+    if len(selected) < max_count and fallback:
+        selected += random.sample(fallback, min(len(fallback), max_count - len(selected)))
 
     if artist_key:
-        q = _GIPHY_HISTORY.get(artist_key)
-        if q is None:
-            q = deque()
-            _GIPHY_HISTORY[artist_key] = q
+        if ring is None:
+            ring = _GifHistoryRing(GIPHY_HISTORY_MAX_IDS_PER_ARTIST)
+            _GIPHY_HISTORY[artist_key] = ring
         for g in selected:
-            gid = g.get("id") or g.get("url") or ""
+            gid = _gid(g)
             if gid:
-                q.append(gid)
-        while len(q) > GIPHY_HISTORY_MAX_IDS_PER_ARTIST:
-            q.popleft()
+                ring.add(gid)
         _save_giphy_history()
 
     return selected
 
 
 def _dedupe_gif_list(gifs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """De-dupe GIFs by (id or url) while preserving order."""
-    seen = set()
-    unique: List[Dict[str, Any]] = []
+    """De-dupe GIFs by (id or url) while preserving order; the first occurrence wins."""
+    unique: Dict[str, Dict[str, Any]] = {}
     for g in gifs or []:
-        gid = g.get("id") or g.get("url") or ""
-        if not gid or gid in seen:
-            continue
-        seen.add(gid)
-        unique.append(g)
-    return unique
+        gid = _gid(g)
+        if gid:
+            unique.setdefault(gid, g)
+    return list(unique.values())
 
 
 def _create_music_video_clip_dicts(clips_dir: Path, clip_paths: List[Path], artist: str, title: str) -> List[Dict[str, Any]]:
@@ -1020,7 +1433,6 @@ def _download_and_precut_music_video(title: str, artist: str, bpm: float) -> Lis
         import subprocess
         from pathlib import Path
         import shutil
-        import traceback
         import sys as _sys
         import os as _os
 
@@ -1132,7 +1544,7 @@ def _download_and_precut_music_video(title: str, artist: str, bpm: float) -> Lis
                     {
                         "error_type": type(e).__name__,
                         "error": str(e)[:300],
-                        "traceback": traceback.format_exc()[-1200:],
+                        "traceback": _debug_traceback(),
                     },
                     "MV-C",
                 )
@@ -1177,7 +1589,7 @@ def _download_and_precut_music_video(title: str, artist: str, bpm: float) -> Lis
                         {
                             "error_type": type(e2).__name__,
                             "error": str(e2)[:300],
-                            "traceback": traceback.format_exc()[-1200:],
+                            "traceback": _debug_traceback(),
                         },
                         "MV-C",
                     )
@@ -1245,7 +1657,7 @@ def _download_and_precut_music_video(title: str, artist: str, bpm: float) -> Lis
                 {
                     "error_type": type(e).__name__,
                     "error": str(e)[:300],
-                    "traceback": traceback.format_exc()[-1200:],
+                    "traceback": _debug_traceback(),
                 },
                 "MV-E",
             )
@@ -1368,11 +1780,7 @@ def _download_and_precut_music_video(title: str, artist: str, bpm: float) -> Lis
     except Exception as e:
         logger.warning(f"Failed to download/precut music video for {artist} - {title}: {e}", exc_info=True)
         # #region agent log
-        try:
-            import traceback as _tb
-            tb = _tb.format_exc()[-1200:]
-        except Exception:
-            tb = "<traceback_unavailable>"
+        tb = _debug_traceback()
         _debug_log(
             "djcap_processor.py:_download_and_precut_music_video:outer",
             "outer_exception",
@@ -1422,6 +1830,7 @@ def _cleanup_old_music_videos(data: Dict[str, Any]) -> None:
                             if file_path.exists() and file_path.is_file():
                                 try:
                                     file_path.unlink()
+                                    _forget_codec_result(filename)
                                     logger.info(f"Cleaned up music video file: {file_path}")
                                 except Exception as e:
                                     logger.warning(f"Failed to delete music video file {file_path}: {e}")
@@ -1443,20 +1852,27 @@ def _cleanup_old_music_videos(data: Dict[str, Any]) -> None:
         logger.warning(f"Error during music video cleanup: {e}")
 
 
-def _enriched_gif_policy_stale(deck_data: Dict[str, Any], enriched: Dict[str, Any]) -> bool:
+def _enriched_gif_policy_stale(enriched: Dict[str, Any], desired_parts: Tuple[str, ...]) -> bool:
     """
     Return True if the currently stored enriched payload doesn't match our current GIF policy.
     This lets us refresh current_enriched even when the track is the "same" (e.g. after config changes).
+
+    `desired_parts` is the caller's `_build_giphy_query_parts(title, artist)` for the deck.
     """
-    desired_parts = _build_giphy_query_parts(deck_data.get("title"), deck_data.get("artist"))
     qp = enriched.get("giphy_query_parts")
-    qp_ok = isinstance(qp, list) and qp[: len(desired_parts)] == desired_parts
+    if not isinstance(qp, list):
+        return True
+    if not desired_parts:
+        # No artist query: only require that a pool exists.
+        return not isinstance(enriched.get("gif_pool"), list)
+    if not _query_parts_match(qp, desired_parts):
+        return True
     gifs = enriched.get("gifs")
-    gifs_ok = isinstance(gifs, list) and len(gifs) <= GIPHY_GIFS_PER_TRACK if desired_parts else True
+    if not isinstance(gifs, list) or len(gifs) > GIPHY_GIFS_PER_TRACK:
+        return True
     pool = enriched.get("gif_pool")
     # Ensure we have a pool to support interactive replacements.
-    pool_ok = isinstance(pool, list) and (len(pool) >= len(gifs or []) if desired_parts else True)
-    return (not qp_ok) or (not gifs_ok) or (not pool_ok)
+    return not isinstance(pool, list) or len(pool) < len(gifs)
 
 # Configure logging
 logging.basicConfig(
@@ -1468,19 +1884,69 @@ logger = logging.getLogger(__name__)
 # Configuration
 DJCAP_JSON_FILE = "/Users/youssefkhalil/AudioGiphy/data/output/djcap_output.json"
 DEBOUNCE_DELAY = 0.1  # seconds to wait after file change before processing
+EVENT_DEBOUNCE_DELAY = 0.15  # quiet period that coalesces a burst of watcher events into one run
+MOVED_MODIFIED_WINDOW = 0.05  # a "modified" this soon after a "moved" is the same atomic write
+WATCH_POLL_INTERVAL = float(os.getenv("DJCAP_WATCH_INTERVAL", "1"))  # seconds; polling observer only
 RUNNING = True
+_STOP_EVENT = threading.Event()  # set on shutdown; the main thread sleeps on it
 
 # Cleanup configuration
 CLEANUP_CHECK_INTERVAL = 100  # Check every N processing cycles
 OUTPUT_FOLDER = "/Users/youssefkhalil/AudioGiphy/data/output"
 MUSIC_VIDEO_CLEANUP_THRESHOLD = 60  # Delete clips 1 minute after track becomes inactive
+# Enriched fields mirrored from current_enriched onto the active deck entry, with the
+# factory for the value used when current_enriched lacks the field (None -> None).
+_ENRICHED_DECK_FIELDS: Tuple[Tuple[str, Any], ...] = (
+    ('lastfm_tags', list),
+    ('refined_keywords', list),
+    ('keyword_scores', dict),
+    ('key_characteristics', list),
+    ('gifs', list),
+    ('gif_pool', list),
+    ('giphy_query', None),
+    ('giphy_query_parts', list),
+    ('google_query_parts', list),
+    ('dance_videos_overlay', list),
+)
+# Exact key set of an inactive deck entry with nothing preserved (see process_deck_transition)
+_INACTIVE_DECK_KEYS = frozenset(('deck', 'title', 'artist', 'bpm', 'key', 'active'))
+
+class _ProcessorState:
+    """Change-detection state carried between `process_metadata_update` calls."""
+    __slots__ = (
+        "last_processed_time", "last_content_sig", "last_active_deck", "last_deck1_active",
+        "last_deck2_active", "last_file_sig", "process_count", "write_seq",
+    )
+
+    def __init__(self) -> None:
+        self.last_processed_time: float = 0.0
+        self.last_content_sig: Optional[tuple] = None  # basic deck fields of the last processed update
+        self.last_active_deck: Optional[str] = None  # Track which deck was active last time
+        self.last_deck1_active: Optional[bool] = None  # Track deck1 active status
+        self.last_deck2_active: Optional[bool] = None  # Track deck2 active status
+        self.last_file_sig: Optional[Tuple[int, int, int]] = None  # (st_ino, st_mtime_ns, st_size) as last read or written
+        self.process_count: int = 0  # Track processing count for periodic cleanup
+        self.write_seq: int = 0  # Sequence number of the most recently queued output write
+
 
 # Track last processed file to avoid duplicates
-_last_processed_time = 0
-_last_processed_content = None
-_last_active_deck = None  # Track which deck was active last time
-_last_deck1_active = None  # Track deck1 active status
-_last_deck2_active = None  # Track deck2 active status
+_STATE = _ProcessorState()
+
+# Output writes run on a single background worker so serialization never blocks
+# event handling; _WRITE_LOCK covers the input check, rename and signature update
+# so the stat gate in process_metadata_update never sees our own write half-recorded.
+_IO_EXEC = ThreadPoolExecutor(max_workers=1, thread_name_prefix="djcap-writer")
+# Used to process both decks concurrently when both are active
+_DECK_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="djcap-deck")
+_WRITE_LOCK = threading.Lock()
+
+
+def _is_video_item(g: Dict[str, Any]) -> bool:
+    return (
+        str(g.get("mime") or "").lower() == "video/mp4"
+        or str(g.get("source") or "") == "dance_mp4_bank"
+        or str(g.get("url") or "").lower().endswith(".mp4")
+    )
 
 
 def signal_handler(sig, frame):
@@ -1488,44 +1954,55 @@ def signal_handler(sig, frame):
     global RUNNING
     logger.info("Received interrupt signal, shutting down...")
     RUNNING = False
+    _STOP_EVENT.set()
+    _flush_now()
     sys.exit(0)
 
 
-def read_djcap_json(file_path: str, max_retries: int = 5, retry_delay: float = 0.1) -> Optional[Dict[str, Any]]:
+def read_djcap_json(file_path: str, max_retries: int = 5, retry_delay: float = 0.01) -> Optional[Dict[str, Any]]:
     """
     Safely read JSON file, handling atomic writes.
     
+    Every writer replaces the file via tmp + rename, so a reader sees either the old or
+    the new complete document; a decode error is the only sign of a non-atomic writer,
+    and is retried with exponential backoff.
+    
     Args:
         file_path: Path to JSON file
-        max_retries: Maximum number of retries if file is locked
-        retry_delay: Delay between retries in seconds
+        max_retries: Maximum number of read attempts
+        retry_delay: Delay before the first retry in seconds (doubles each retry)
         
     Returns:
         Parsed JSON dictionary or None if read fails
     """
-    temp_file = f"{file_path}.tmp"
-    
     for attempt in range(max_retries):
         try:
-            # Check if temp file exists (atomic write in progress)
-            if os.path.exists(temp_file):
-                time.sleep(retry_delay)
-                continue
-            
             # Read the JSON file
-            with open(file_path, 'r') as f:
-                content = f.read().strip()
-                if not content:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
                     logger.debug("JSON file is empty")
                     return None
-                
-                data = json.loads(content)
-                return data
+                if not ORJSON_AVAILABLE:
+                    content = f.read()
+                    if not content.strip():
+                        logger.debug("JSON file is empty")
+                        return None
+                    return _json_loads(content)
+                # Decode straight from the mapped pages instead of copying into a bytes
+                # object first. Every writer replaces the file via rename rather than
+                # truncating it in place, so the mapping can't shrink underneath us.
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm[:1].isspace() and not mm[:].strip():
+                        logger.debug("JSON file is empty")
+                        return None
+                    with memoryview(mm) as view:
+                        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+                        return _json_loads(view)
                 
         except json.JSONDecodeError as e:
             logger.warning(f"JSON decode error (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
-                time.sleep(retry_delay)
+                time.sleep(retry_delay * (2 ** attempt))
             else:
                 logger.error(f"Failed to read JSON after {max_retries} attempts")
                 return None
@@ -1541,10 +2018,23 @@ def read_djcap_json(file_path: str, max_retries: int = 5, retry_delay: float = 0
     return None
 
 
+# Memoized enrichment results, keyed on the inputs that reach the output.
+# Bump ENRICH_POLICY_VERSION when the enrichment output format/policy changes.
+ENRICH_POLICY_VERSION = 1
+ENRICH_CACHE_TTL = 300.0  # seconds
+ENRICH_CACHE_MAX_ENTRIES = 128
+_enrich_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_enrich_cache_lock = threading.Lock()
+
+
 def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Enrich a single deck's data with keywords, tags, and GIFs.
     Only enriches if deck is active.
+
+    Results for active decks are memoized per track for ENRICH_CACHE_TTL seconds,
+    so toggling play/pause or re-checking policy doesn't redo the work. A shallow
+    copy is returned because callers add per-deck fields to the result.
     
     Args:
         deck_data: Dictionary with deck metadata (title, artist, bpm, key, active)
@@ -1552,6 +2042,35 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         Enriched deck data with additional fields (or basic data if inactive)
     """
+    if not deck_data.get('active', False):
+        return _enrich_deck_data_uncached(deck_data)
+
+    cache_key = (
+        deck_data.get('title'),
+        deck_data.get('artist'),
+        deck_data.get('bpm'),
+        deck_data.get('key'),
+        deck_data.get('deck'),
+        ENRICH_POLICY_VERSION,
+    )
+    now = time.monotonic()
+    with _enrich_cache_lock:
+        hit = _enrich_cache.get(cache_key)
+        if hit is not None and now - hit[0] < ENRICH_CACHE_TTL:
+            _enrich_cache.move_to_end(cache_key)
+            return dict(hit[1])
+
+    enriched = _enrich_deck_data_uncached(deck_data)
+    with _enrich_cache_lock:
+        _enrich_cache[cache_key] = (now, enriched)
+        _enrich_cache.move_to_end(cache_key)
+        while len(_enrich_cache) > ENRICH_CACHE_MAX_ENTRIES:
+            _enrich_cache.popitem(last=False)
+    return dict(enriched)
+
+
+def _enrich_deck_data_uncached(deck_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the enriched payload for a deck (see `enrich_deck_data`)."""
     # #region agent log
     _debug_log("djcap_processor.py:enrich_deck_data", "Function entry", {"active": deck_data.get('active'), "title": deck_data.get('title'), "artist": deck_data.get('artist')}, "I")
     # #endregion
@@ -1578,7 +2097,7 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
     # #region agent log
     _debug_log("djcap_processor.py:enrich_deck_data", "Enriching active deck", {"title": title, "artist": artist, "bpm": bpm, "key": key}, "I")
     # #endregion
-    logger.info(f"Enriching active deck: {title} - {artist}")
+    logger.info("Enriching active deck: %s - %s", title, artist)
     
     # Build keyword collection
     keyword_collection = []
@@ -1591,15 +2110,15 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
     if key:
         key_characteristics = translate_key_to_characteristics(key)
         keyword_collection.extend(key_characteristics)
-        logger.info(f"Translated key '{key}' to characteristics: {key_characteristics}")
+        logger.debug("Translated key '%s' to characteristics: %s", key, key_characteristics)
     
     # Get Last.fm tags (optional - skip if disabled or no API key)
     lastfm_tags = []
     if USE_LASTFM_API and METADATA_MODULES_AVAILABLE and LASTFM_API_KEY and artist and title:
         try:
-            logger.info(f"Fetching Last.fm tags for: {artist} - {title}")
-            lastfm_tags = get_lastfm_tags(artist, title)
-            logger.info(f"Got {len(lastfm_tags)} Last.fm tags: {lastfm_tags}")
+            logger.info("Fetching Last.fm tags for: %s - %s", artist, title)
+            lastfm_tags = list(_lastfm_tags_cached(artist, title))
+            logger.info("Got %d Last.fm tags: %s", len(lastfm_tags), lastfm_tags)
         except Exception as e:
             logger.warning(f"Error fetching Last.fm tags (skipping): {e}")
     else:
@@ -1617,7 +2136,7 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
                 keywords, scores = result
                 refined_keywords = list(set(keyword_collection + keywords))
                 keyword_scores = scores
-            logger.info(f"Final keywords: {refined_keywords}")
+            logger.info("Final keywords: %s", refined_keywords)
         except Exception as e:
             logger.warning(f"Error analyzing keywords (using basic keywords): {e}")
             # Use basic keyword collection if analyzer fails
@@ -1626,14 +2145,14 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
         logger.debug("Using basic keywords (title, artist, key characteristics) - no API calls")
     
     # DISABLED: GIPHY and Google videos - only use bank MP4s and music videos
-    logger.info("GIPHY and Google videos disabled - using only bank MP4s and music videos")
+    logger.debug("GIPHY and Google videos disabled - using only bank MP4s and music videos")
     gifs: List[Dict[str, Any]] = []
     gif_pool: List[Dict[str, Any]] = []
     google_gifs: List[Dict[str, Any]] = []
     google_query_parts: List[str] = []
     
     # Show music video with dance video overlays every other second
-    logger.info("Visuals mode: music video with dance video overlays")
+    logger.debug("Visuals mode: music video with dance video overlays")
     
     # Set gifs to empty list so only music video is shown in main rotation
     gifs = []
@@ -1642,9 +2161,9 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
     from src.dance_video_bank import get_dance_videos
     # Request more videos to get good variety (each video creates 3 clips, so 20 videos = 60 clips, but we limit to 20)
     dance_videos_for_overlay = get_dance_videos(count=60)  # Get many clips for variety
-    logger.info(f"Dance video overlay: {len(dance_videos_for_overlay)} video clips available for overlay")
+    logger.debug("Dance video overlay: %d video clips available for overlay", len(dance_videos_for_overlay))
     if dance_videos_for_overlay:
-        logger.info(f"Sample overlay video URL: {dance_videos_for_overlay[0].get('url', 'no url')}")
+        logger.debug("Sample overlay video URL: %s", dance_videos_for_overlay[0].get('url', 'no url'))
     
     # Create enriched deck data - only copy basic fields to avoid recursive structures
     # Do NOT copy current_enriched, next_enriched, or other nested structures
@@ -1667,7 +2186,7 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
         'dance_videos_overlay': dance_videos_for_overlay  # Dance videos for overlay
     }
     
-    logger.debug(f"Enriched deck includes google_query_parts: {'google_query_parts' in enriched_deck}, value: {enriched_deck.get('google_query_parts')}")
+    logger.debug("Enriched deck includes google_query_parts: %s, value: %s", 'google_query_parts' in enriched_deck, enriched_deck.get('google_query_parts'))
     
     # #region agent log
     _debug_log("djcap_processor.py:enrich_deck_data", "Enrichment complete", {"gifs_count": len(gifs), "gif_pool_size": len(gif_pool), "refined_keywords_count": len(refined_keywords)}, "I")
@@ -1679,10 +2198,6 @@ def enrich_deck_data(deck_data: Dict[str, Any]) -> Dict[str, Any]:
 
 
 
-
-# Track processing count for periodic cleanup
-_process_count = 0
-
 def process_metadata_update(file_path: str):
     """
     Process metadata update when JSON file changes.
@@ -1690,11 +2205,25 @@ def process_metadata_update(file_path: str):
     Args:
         file_path: Path to the JSON file that changed
     """
-    global _last_processed_time, _last_processed_content, _last_active_deck, _last_deck1_active, _last_deck2_active, _process_count
+    state = _STATE
     
     # Debounce: check if we recently processed this file
-    current_time = time.time()
-    if current_time - _last_processed_time < DEBOUNCE_DELAY:
+    current_time = time.monotonic()
+    if current_time - state.last_processed_time < DEBOUNCE_DELAY:
+        return
+
+    # Skip duplicate events (and the echo of our own write) without opening the file
+    try:
+        with _WRITE_LOCK:
+            st = os.stat(file_path)
+    except FileNotFoundError:
+        logger.warning(f"JSON file not found: {file_path}")
+        return
+    # tmp + rename gives every write a new inode, so a rewrite is caught even when
+    # size and mtime collide (coarse filesystem timestamps)
+    file_sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if file_sig == state.last_file_sig:
+        logger.debug("File unchanged since last read/write, skipping")
         return
     
     # Read JSON file
@@ -1702,6 +2231,7 @@ def process_metadata_update(file_path: str):
     if not data:
         logger.warning("Failed to read JSON file")
         return
+    state.last_file_sig = file_sig
     
     # Determine current active deck based on active attribute
     deck1_active = data.get('deck1', {}).get('active', False)
@@ -1720,49 +2250,36 @@ def process_metadata_update(file_path: str):
     
     # Check if content actually changed OR if active status changed
     # Compare only basic fields (ignore enriched fields that we add)
-    basic_data = {
-        'deck1': {
-            'deck': data.get('deck1', {}).get('deck'),
-            'title': data.get('deck1', {}).get('title'),
-            'artist': data.get('deck1', {}).get('artist'),
-            'bpm': data.get('deck1', {}).get('bpm'),
-            'key': data.get('deck1', {}).get('key'),
-            'active': data.get('deck1', {}).get('active')
-        },
-        'deck2': {
-            'deck': data.get('deck2', {}).get('deck'),
-            'title': data.get('deck2', {}).get('title'),
-            'artist': data.get('deck2', {}).get('artist'),
-            'bpm': data.get('deck2', {}).get('bpm'),
-            'key': data.get('deck2', {}).get('key'),
-            'active': data.get('deck2', {}).get('active')
-        },
-        'active_deck': data.get('active_deck')
-    }
-    content_str = json.dumps(basic_data, sort_keys=True)
-    content_changed = content_str != _last_processed_content
+    d1 = data.get('deck1') or {}
+    d2 = data.get('deck2') or {}
+    content_sig = (
+        d1.get('deck'), d1.get('title'), d1.get('artist'), d1.get('bpm'), d1.get('key'), d1.get('active'),
+        d2.get('deck'), d2.get('title'), d2.get('artist'), d2.get('bpm'), d2.get('key'), d2.get('active'),
+        data.get('active_deck'),
+    )
+    content_changed = content_sig != state.last_content_sig
     
     # #region agent log
     _debug_log("djcap_processor.py:process_metadata_update", "Content change check", {
         "content_changed": content_changed,
-        "deck1_title": basic_data['deck1'].get('title'),
-        "deck1_artist": basic_data['deck1'].get('artist'),
-        "deck1_active": basic_data['deck1'].get('active'),
-        "deck2_title": basic_data['deck2'].get('title'),
-        "deck2_artist": basic_data['deck2'].get('artist'),
-        "deck2_active": basic_data['deck2'].get('active'),
-        "active_deck": basic_data.get('active_deck'),
-        "has_last_content": bool(_last_processed_content)
+        "deck1_title": d1.get('title'),
+        "deck1_artist": d1.get('artist'),
+        "deck1_active": d1.get('active'),
+        "deck2_title": d2.get('title'),
+        "deck2_artist": d2.get('artist'),
+        "deck2_active": d2.get('active'),
+        "active_deck": data.get('active_deck'),
+        "has_last_content": state.last_content_sig is not None
     }, "K")
     # #endregion
     
     # Check if active status of either deck changed
-    deck1_active_changed = deck1_active != _last_deck1_active
-    deck2_active_changed = deck2_active != _last_deck2_active
+    deck1_active_changed = deck1_active != state.last_deck1_active
+    deck2_active_changed = deck2_active != state.last_deck2_active
     active_status_changed = deck1_active_changed or deck2_active_changed
     
     # Check if active deck changed
-    active_deck_changed = current_active_deck != _last_active_deck
+    active_deck_changed = current_active_deck != state.last_active_deck
     
     # Also check if active deck doesn't have enriched fields yet
     # OR if enriched fields are stale relative to our current safe GIF policy.
@@ -1785,25 +2302,17 @@ def process_metadata_update(file_path: str):
         gifs = active_deck_data.get('gifs')
         if isinstance(gifs, list):
             total_items = len(gifs)
-            # Count only non-video media (best-effort)
-            non_video = [
-                g for g in gifs
-                if isinstance(g, dict)
-                and (str(g.get("mime") or "").lower() != "video/mp4")
-                and (str(g.get("source") or "") != "dance_mp4_bank")
-                and (not str(g.get("url") or "").lower().endswith(".mp4"))
-            ]
-            gifs_ok = total_items > 0
-            non_video_count = len(non_video)
+            # Count only non-video media (best-effort; used for diagnostics only)
+            non_video_count = sum(1 for g in gifs if isinstance(g, dict) and not _is_video_item(g))
         else:
             total_items = 0
             non_video_count = 0
-            gifs_ok = False
 
-        # Require query parts to match our intended [title, artist]
+        # Require query parts to match our intended artist-only parts
         qp = active_deck_data.get('giphy_query_parts')
-        qp_ok = (isinstance(qp, list) and qp[:2] == desired_parts) if desired_parts else True
+        qp_ok = (isinstance(qp, list) and _query_parts_match(qp, desired_parts, exact=True)) if desired_parts else True
 
+        gifs_ok = total_items > 0
         needs_enrichment = (not has_keywords) or (not gifs_ok) or (not qp_ok)
         # #region agent log
         _debug_log(
@@ -1830,21 +2339,22 @@ def process_metadata_update(file_path: str):
         return
     
     if needs_enrichment:
-        logger.info(f"Active deck '{current_active_deck}' needs enrichment - processing")
+        logger.debug("Active deck '%s' needs enrichment - processing", current_active_deck)
     elif active_status_changed:
-        logger.info(f"Active status changed - deck1: {_last_deck1_active}→{deck1_active}, deck2: {_last_deck2_active}→{deck2_active} - re-enriching")
+        logger.info("Active status changed - deck1: %s→%s, deck2: %s→%s - re-enriching",
+                    state.last_deck1_active, deck1_active, state.last_deck2_active, deck2_active)
     elif active_deck_changed:
-        logger.info(f"Active deck changed from '{_last_active_deck}' to '{current_active_deck}' - re-enriching")
+        logger.info("Active deck changed from '%s' to '%s' - re-enriching", state.last_active_deck, current_active_deck)
     elif content_changed:
         logger.info("Content changed - processing update")
     
-    _last_processed_time = current_time
-    _last_processed_content = content_str
-    _last_active_deck = current_active_deck
-    _last_deck1_active = deck1_active
-    _last_deck2_active = deck2_active
+    state.last_processed_time = current_time
+    state.last_content_sig = content_sig
+    state.last_active_deck = current_active_deck
+    state.last_deck1_active = deck1_active
+    state.last_deck2_active = deck2_active
     
-    logger.info("Processing metadata update and enriching active decks...")
+    logger.debug("Processing metadata update and enriching active decks...")
     
     # Enrich active decks with transition system
     deck1_data = data.get('deck1', {})
@@ -1852,25 +2362,26 @@ def process_metadata_update(file_path: str):
     
     # Helper function to handle transition for a deck
     def process_deck_transition(deck_data, deck_name, is_active):
+        title = deck_data.get('title')
+        artist = deck_data.get('artist')
+        bpm = deck_data.get('bpm')
+        # String form is the music-video cache key; tracks are compared as tuples.
+        # Interned so every lookup for the same track hits the cached key by identity.
+        track_id = sys.intern(f"{title}|{artist}")
+        now = time.time()
+
         if not is_active:
             # Inactive deck (paused / not playing):
             # Keep basic metadata, but ALSO preserve the last known enriched visuals
             # for the same track so the frontend doesn't "glitch" into empty-state.
-            base = {
-                'deck': deck_data.get('deck'),
-                'title': deck_data.get('title'),
-                'artist': deck_data.get('artist'),
-                'bpm': deck_data.get('bpm'),
-                'key': deck_data.get('key'),
-                'active': False
-            }
             current_enriched = deck_data.get('current_enriched') or {}
-            track_id = f"{deck_data.get('title')}|{deck_data.get('artist')}"
+            last_track = None
             last_track_id = None
             if current_enriched:
-                last_track_id = f"{current_enriched.get('title')}|{current_enriched.get('artist')}"
+                last_track = (current_enriched.get('title'), current_enriched.get('artist'))
+                last_track_id = f"{last_track[0]}|{last_track[1]}"
             
-            same_track = track_id == last_track_id and bool(deck_data.get('title')) and bool(deck_data.get('artist'))
+            same_track = (title, artist) == last_track and bool(title) and bool(artist)
             
             # #region agent log
             _debug_log(
@@ -1879,27 +2390,24 @@ def process_metadata_update(file_path: str):
                 {
                     "deck_name": deck_name,
                     "is_active": is_active,
-                    "title": deck_data.get('title'),
-                    "artist": deck_data.get('artist'),
-                    "bpm": deck_data.get('bpm'),
+                    "title": title,
+                    "artist": artist,
+                    "bpm": bpm,
                     "track_id": track_id,
                     "last_track_id": last_track_id,
                     "same_track": same_track,
                     "has_current_enriched": bool(current_enriched),
-                    "has_title": bool(deck_data.get('title')),
-                    "has_artist": bool(deck_data.get('artist')),
-                    "has_bpm": bool(deck_data.get('bpm')),
+                    "has_title": bool(title),
+                    "has_artist": bool(artist),
+                    "has_bpm": bool(bpm),
                 },
                 "MV-DEBUG-1",
             )
             # #endregion
             
             # PROACTIVE: If this is a new track in the inactive deck, start downloading its music video
-            if not same_track and deck_data.get('title') and deck_data.get('artist') and deck_data.get('bpm'):
-                title = deck_data.get('title')
-                artist = deck_data.get('artist')
-                bpm = deck_data.get('bpm')
-                logger.info(f"Proactive: Detected new track in inactive {deck_name}: {title} by {artist} - starting music video download")
+            if not same_track and title and artist and bpm:
+                logger.info("Proactive: Detected new track in inactive %s: %s by %s - starting music video download", deck_name, title, artist)
                 # #region agent log
                 _debug_log(
                     f"djcap_processor.py:process_deck_transition:{deck_name}",
@@ -1962,7 +2470,7 @@ def process_metadata_update(file_path: str):
                 preserved['music_video_downloaded_at'] = mv.get('downloaded_at')
                 preserved['music_video_clips'] = mv.get('clips') or []
                 preserved['music_video'] = mv.get('video')
-                logger.info(f"Proactive: Music video for {deck_name} track {track_id} is {'ready' if mv.get('status') == 'ready' else 'downloading'}")
+                logger.debug("Proactive: Music video for %s track %s is %s", deck_name, track_id, 'ready' if mv.get('status') == 'ready' else 'downloading')
 
             # #region agent log
             _debug_log(
@@ -1978,36 +2486,48 @@ def process_metadata_update(file_path: str):
             )
             # #endregion
 
-            merged = {**base, **preserved}
+            if (not preserved and deck_data.get('active') is False
+                    and deck_data.keys() == _INACTIVE_DECK_KEYS):
+                # Already in the trimmed inactive shape; reuse it instead of rebuilding.
+                return deck_data
+            merged = {
+                'deck': deck_data.get('deck'),
+                'title': title,
+                'artist': artist,
+                'bpm': bpm,
+                'key': deck_data.get('key'),
+                'active': False
+            }
+            merged.update(preserved)
             return merged
         
         # Active deck - handle transition
         current_enriched = deck_data.get('current_enriched')
-        next_enriched = deck_data.get('next_enriched')
         
         # Check if this is a new track (title/artist changed)
-        track_id = f"{deck_data.get('title')}|{deck_data.get('artist')}"
+        last_track = None
         last_track_id = None
         if current_enriched:
-            last_track_id = f"{current_enriched.get('title')}|{current_enriched.get('artist')}"
+            last_track = (current_enriched.get('title'), current_enriched.get('artist'))
+            last_track_id = f"{last_track[0]}|{last_track[1]}"
         
         # #region agent log
         _debug_log(f"djcap_processor.py:process_deck_transition:{deck_name}", "Track change detection", {
             "track_id": track_id,
             "last_track_id": last_track_id,
             "has_current_enriched": bool(current_enriched),
-            "deck_title": deck_data.get('title'),
-            "deck_artist": deck_data.get('artist'),
-            "current_enriched_title": current_enriched.get('title') if current_enriched else None,
-            "current_enriched_artist": current_enriched.get('artist') if current_enriched else None
+            "deck_title": title,
+            "deck_artist": artist,
+            "current_enriched_title": last_track[0] if last_track else None,
+            "current_enriched_artist": last_track[1] if last_track else None
         }, "K")
         # #endregion
         
-        is_new_track = track_id != last_track_id
+        is_new_track = (title, artist) != last_track
         
         if is_new_track:
             # New track detected - move current to next, create new current
-            logger.info(f"New track detected for {deck_name}: {deck_data.get('title')}")
+            logger.info("New track detected for %s: %s", deck_name, title)
             # #region agent log
             _debug_log(f"djcap_processor.py:process_deck_transition:{deck_name}", "New track detected", {
                 "track_id": track_id,
@@ -2016,20 +2536,19 @@ def process_metadata_update(file_path: str):
             }, "K")
             # #endregion
             
-            # Move current to next (for transition)
+            # Move current to next (for transition). No copy needed: enrich_deck_data
+            # below returns a freshly built dict, so the old object is no longer
+            # referenced from current_enriched once it's replaced.
             if current_enriched:
-                deck_data['next_enriched'] = current_enriched.copy()
+                deck_data['next_enriched'] = current_enriched
             
             # Start music-video download for this track (non-blocking, cached)
-            title = deck_data.get('title')
-            artist = deck_data.get('artist')
-            bpm = deck_data.get('bpm')
             _maybe_start_music_video_download(track_id, title, artist, bpm)
             
             # Create new enriched data
             new_enriched = enrich_deck_data(deck_data)
             # Track start time for syncing (best-effort)
-            new_enriched['track_started_at'] = time.time()
+            new_enriched['track_started_at'] = now
             deck_data['current_enriched'] = new_enriched
             
             # Copy dance_videos_overlay to top level for frontend access
@@ -2039,7 +2558,7 @@ def process_metadata_update(file_path: str):
             # Set transition state
             deck_data['transition'] = {
                 'in_progress': True,
-                'start_time': time.time(),
+                'start_time': now,
                 'duration': 2.0  # 2 second transition
             }
         else:
@@ -2047,7 +2566,7 @@ def process_metadata_update(file_path: str):
             if (
                 not current_enriched
                 or not current_enriched.get('refined_keywords')
-                or _enriched_gif_policy_stale(deck_data, current_enriched)
+                or _enriched_gif_policy_stale(current_enriched, _build_giphy_query_parts(title, artist))
             ):
                 # No current enriched data, create it
                 new_enriched = enrich_deck_data(deck_data)
@@ -2062,38 +2581,30 @@ def process_metadata_update(file_path: str):
 
             # Ensure track_started_at exists for sync (e.g., after restart)
             if deck_data.get('current_enriched') and not deck_data['current_enriched'].get('track_started_at'):
-                deck_data['current_enriched']['track_started_at'] = time.time()
+                deck_data['current_enriched']['track_started_at'] = now
 
             # Even if it's the same track (e.g., after restart), kick off music-video download
             # when we don't have clips yet.
-            title = deck_data.get('title')
-            artist = deck_data.get('artist')
-            bpm = deck_data.get('bpm')
             _maybe_start_music_video_download(track_id, title, artist, bpm)
             
             # Check if transition is complete
             transition = deck_data.get('transition', {})
             if transition.get('in_progress'):
-                elapsed = time.time() - transition.get('start_time', 0)
+                elapsed = now - transition.get('start_time', 0)
                 if elapsed >= transition.get('duration', 2.0):
                     # Transition complete - clear next
                     deck_data['next_enriched'] = None
                     deck_data['transition'] = {'in_progress': False}
-                    logger.info(f"Transition complete for {deck_name}")
+                    logger.info("Transition complete for %s", deck_name)
         
         # Merge current enriched into main deck data for easy access
         if deck_data.get('current_enriched'):
             current = deck_data['current_enriched']
-            deck_data['lastfm_tags'] = current.get('lastfm_tags', [])
-            deck_data['refined_keywords'] = current.get('refined_keywords', [])
-            deck_data['keyword_scores'] = current.get('keyword_scores', {})
-            deck_data['key_characteristics'] = current.get('key_characteristics', [])
-            deck_data['gifs'] = current.get('gifs', [])
-            deck_data['gif_pool'] = current.get('gif_pool', [])
-            deck_data['giphy_query'] = current.get('giphy_query')
-            deck_data['giphy_query_parts'] = current.get('giphy_query_parts', [])
-            deck_data['google_query_parts'] = current.get('google_query_parts', [])
-            deck_data['dance_videos_overlay'] = current.get('dance_videos_overlay', [])
+            for field_name, default_factory in _ENRICHED_DECK_FIELDS:
+                if field_name in current:
+                    deck_data[field_name] = current[field_name]
+                else:
+                    deck_data[field_name] = default_factory() if default_factory else None
             # Apply cached music-video result into current_enriched (so djcap preserves it)
             # and also expose it directly on the deck object for the frontend.
             mv = _music_video_cache.get(track_id)
@@ -2126,45 +2637,116 @@ def process_metadata_update(file_path: str):
                     deck_data['music_video_clips'] = current.get('music_video_clips', [])
             if 'music_video_downloaded_at' not in deck_data:
                 deck_data['music_video_downloaded_at'] = deck_data.get('music_video_downloaded_at') or current.get('music_video_downloaded_at', 0)
-            logger.info(
-                f"After merge for {deck_name}: gifs={len(deck_data['gifs'])}, "
-                f"has_current_enriched={'current_enriched' in deck_data}, "
-                f"music_video_clips={len(deck_data.get('music_video_clips', []))}"
+            logger.debug(
+                "After merge for %s: gifs=%d, has_current_enriched=%s, music_video_clips=%d",
+                deck_name, len(deck_data['gifs']), 'current_enriched' in deck_data,
+                len(deck_data.get('music_video_clips') or []),
             )
         
         return deck_data
     
     # Process both decks
     if deck1_active:
-        logger.info(f"Processing deck1: {deck1_data.get('title')} - {deck1_data.get('artist')}")
-        data['deck1'] = process_deck_transition(deck1_data, 'deck1', True)
-    else:
-        data['deck1'] = process_deck_transition(deck1_data, 'deck1', False)
-    
+        logger.info("Processing deck1: %s - %s", deck1_data.get('title'), deck1_data.get('artist'))
     if deck2_active:
-        logger.info(f"Processing deck2: {deck2_data.get('title')} - {deck2_data.get('artist')}")
-        data['deck2'] = process_deck_transition(deck2_data, 'deck2', True)
+        logger.info("Processing deck2: %s - %s", deck2_data.get('title'), deck2_data.get('artist'))
+    if deck1_active and deck2_active:
+        # Both decks may need enrichment (network I/O) during a mix; do them side by side
+        f1 = _DECK_POOL.submit(process_deck_transition, deck1_data, 'deck1', True)
+        f2 = _DECK_POOL.submit(process_deck_transition, deck2_data, 'deck2', True)
+        data['deck1'], data['deck2'] = f1.result(), f2.result()
     else:
-        data['deck2'] = process_deck_transition(deck2_data, 'deck2', False)
+        data['deck1'] = process_deck_transition(deck1_data, 'deck1', deck1_active)
+        data['deck2'] = process_deck_transition(deck2_data, 'deck2', deck2_active)
     
     # Update active_deck field
     data['active_deck'] = current_active_deck
     
-    # Write enriched data back to djcap_output.json atomically
+    # Write enriched data back to djcap_output.json atomically, off the event thread.
+    # `data` is not touched again here, so the writer can serialize it without a copy.
+    state.write_seq += 1
+    _IO_EXEC.submit(_write_enriched_output, data, file_path, state.write_seq, file_sig)
+
+
+def _write_file_bytes(path: str, payload: bytes, fsync: bool = False) -> Tuple[int, int, int]:
+    """
+    Write `payload` to `path` with raw fd writes (no Python-level buffering).
+
+    Returns the written file's (st_ino, st_mtime_ns, st_size); a later rename keeps all three.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+        if fsync:
+            os.fsync(fd)
+        st = os.fstat(fd)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(dir_path: str) -> None:
+    """Persist a rename by fsyncing the containing directory (best-effort; POSIX only)."""
+    try:
+        fd = os.open(dir_path or ".", os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_enriched_output(
+    data: Dict[str, Any], file_path: str, seq: int, input_sig: Tuple[int, int, int]
+) -> None:
+    """
+    Serialize enriched data and atomically replace `file_path` (runs on `_IO_EXEC`).
+
+    A write is dropped if a newer one has been queued behind it, or if the file
+    no longer has `input_sig` (the signature it had when `data` was read): djcap.py
+    has written a newer snapshot since, and replacing it would lose that update.
+    """
+    state = _STATE
+    if seq != state.write_seq:
+        logger.debug("Skipping superseded write #%d", seq)
+        return
     try:
         temp_file = f"{file_path}.tmp"
-        with open(temp_file, 'w') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        Path(temp_file).rename(file_path)
-        logger.info("Enriched metadata saved to djcap_output.json")
+        payload = _json_dumps_bytes(data, pretty=logger.isEnabledFor(logging.DEBUG))
+        written_sig = _write_file_bytes(temp_file, payload, fsync=DURABLE_WRITES)
+        with _WRITE_LOCK:
+            try:
+                st = os.stat(file_path)
+                live_sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                live_sig = None
+            if live_sig != input_sig:
+                logger.debug("Input changed since it was read, dropping write #%d", seq)
+                try:
+                    os.unlink(temp_file)
+                except OSError:
+                    pass
+                return
+            os.replace(temp_file, file_path)
+            # Signature of our own file, not whatever is at the path by the time we'd stat it
+            state.last_file_sig = written_sig
+        if DURABLE_WRITES:
+            _fsync_dir(os.path.dirname(file_path))
+        logger.debug("Enriched metadata saved to djcap_output.json")
         
         # Periodic cleanup check
-        _process_count += 1
+        state.process_count += 1
         
         # Cleanup old music videos
         _cleanup_old_music_videos(data)
         
-        if _process_count % CLEANUP_CHECK_INTERVAL == 0:
+        if state.process_count % CLEANUP_CHECK_INTERVAL == 0:
             try:
                 cleanup_output_folder(OUTPUT_FOLDER)
             except Exception as e:
@@ -2173,43 +2755,148 @@ def process_metadata_update(file_path: str):
         logger.error(f"Failed to save enriched metadata: {e}", exc_info=True)
 
 
+_HANDLED_SRC_EVENTS = frozenset(("created", "modified", "closed"))
+
+
 class DjcapJsonHandler(FileSystemEventHandler):
     """File system event handler for djcap_output.json changes."""
 
+    def __init__(self):
+        super().__init__()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        # Processing runs on one worker so the observer thread only ever enqueues.
+        # A single slot coalesces requests that arrive while a run is in progress.
+        self._work_q: "queue.Queue[None]" = queue.Queue(maxsize=1)
+        self._worker = threading.Thread(target=self._run_worker, name="djcap-processor", daemon=True)
+        self._worker.start()
+        self._last_moved_at = 0.0
+        self._event_count = 0  # accepted events since the last debounce timer fired
+        # Set once the backend reports close-after-write (inotify IN_CLOSE_WRITE);
+        # from then on "modified" events are redundant with the close that follows.
+        self._closes_seen = False
+        # The watched path is fixed for the handler's lifetime; resolve it once.
+        # Only the directory is resolved: the file itself is replaced on every write.
+        self._target_name = os.path.basename(DJCAP_JSON_FILE)
+        self._target_abs = os.path.join(os.path.realpath(os.path.dirname(os.path.abspath(DJCAP_JSON_FILE))), self._target_name)
+
     def _maybe_process(self, path: str, event_name: str):
         """
         Process events that affect the target JSON file.
 
         Note: `djcap.py` writes atomically (tmp file + rename), which can show up as
         moved/created events rather than a pure "modified" on some platforms/backends.
+        In-place writes fire several "modified" events but a single "closed" one where
+        the backend supports it, so "modified" is ignored once closes are observed.
+        Events are debounced: each one (re)starts a short timer, so a burst of
+        events for one write results in a single `process_metadata_update` run,
+        which is handed to the worker thread.
         """
-        if not path:
+        # Cheap string checks first: sibling tmp files fail the basename test, and
+        # events for the watched (resolved) directory already carry the target path,
+        # so the realpath fallback is rarely needed.
+        if not path or os.path.basename(path) != self._target_name:
             return
-        if os.path.abspath(path) != os.path.abspath(DJCAP_JSON_FILE):
+        if path != self._target_abs and os.path.join(os.path.realpath(os.path.dirname(path)), self._target_name) != self._target_abs:
             return
 
-        logger.info(f"File {event_name} detected: {path}")
-        # Small delay to ensure atomic rename/write is complete
-        time.sleep(0.1)
-        process_metadata_update(DJCAP_JSON_FILE)
+        now = time.monotonic()
+        with self._lock:
+            if event_name == "closed":
+                self._closes_seen = True
+            elif event_name == "modified" and self._closes_seen:
+                return
+            if event_name == "moved":
+                self._last_moved_at = now
+            elif event_name == "modified" and now - self._last_moved_at < MOVED_MODIFIED_WINDOW:
+                # Trailing event of an atomic rename that is already scheduled
+                return
 
-    def on_modified(self, event):
-        """Handle file modification events."""
-        if event.is_directory:
-            return
-        self._maybe_process(getattr(event, "src_path", None), "modified")
+            logger.debug("File %s detected: %s", event_name, path)
+            self._event_count += 1
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(EVENT_DEBOUNCE_DELAY, self._on_debounce_elapsed)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_debounce_elapsed(self):
+        with self._lock:
+            count, self._event_count = self._event_count, 0
+        logger.debug("Coalesced %d watcher event(s) into one processing run", count)
+        self.request_processing()
+
+    def request_processing(self):
+        """Queue a `process_metadata_update` run unless one is already pending."""
+        try:
+            self._work_q.put_nowait(None)
+        except queue.Full:
+            pass  # the pending run will read the latest file contents
 
-    def on_created(self, event):
-        """Handle file creation events (can occur with atomic writes)."""
-        if event.is_directory:
-            return
-        self._maybe_process(getattr(event, "src_path", None), "created")
+    def _run_worker(self):
+        while True:
+            self._work_q.get()
+            try:
+                process_metadata_update(DJCAP_JSON_FILE)
+            except Exception as e:
+                logger.error(f"Error processing {DJCAP_JSON_FILE}: {e}", exc_info=True)
 
-    def on_moved(self, event):
-        """Handle file move/rename events (common for atomic writes: tmp -> final)."""
+    def dispatch(self, event):
+        """
+        Route watchdog events to `_maybe_process` from a single entry point.
+
+        - created / modified: the target was written in place
+        - closed: close-after-write (inotify backend), one per completed write
+        - moved: atomic write (tmp -> final); the target is the destination path
+        Other event types (deleted, opened, closed_no_write) are ignored.
+        """
         if event.is_directory:
             return
-        self._maybe_process(getattr(event, "dest_path", None), "moved")
+        event_type = event.event_type
+        if event_type == "moved":
+            self._maybe_process(event.dest_path, event_type)
+        elif event_type in _HANDLED_SRC_EVENTS:
+            self._maybe_process(event.src_path, event_type)
+
+
+def _start_observer(handler: "DjcapJsonHandler", watch_dir: str):
+    """
+    Start a watchdog observer on `watch_dir` (non-recursive).
+
+    Prefers the platform's native backend (FSEvents on macOS, inotify on Linux) and
+    falls back to a PollingObserver that rescans every WATCH_POLL_INTERVAL seconds,
+    e.g. when inotify watches are exhausted.
+    """
+    candidates = []
+    if sys.platform == "darwin":
+        try:
+            from watchdog.observers.fsevents import FSEventsObserver
+            candidates.append(FSEventsObserver)
+        except ImportError:
+            pass
+    elif sys.platform.startswith("linux"):
+        try:
+            from watchdog.observers.inotify import InotifyObserver
+            candidates.append(InotifyObserver)
+        except ImportError:
+            pass
+    if Observer not in candidates and Observer.__name__ != "PollingObserver":
+        candidates.append(Observer)  # native backend on other platforms (kqueue, Windows)
+
+    for observer_cls in candidates:
+        observer = observer_cls()
+        try:
+            observer.schedule(handler, path=watch_dir, recursive=False)
+            observer.start()
+            return observer
+        except OSError as e:
+            logger.warning(f"{observer_cls.__name__} unavailable ({e}), trying next watcher backend")
+
+    from watchdog.observers.polling import PollingObserver
+    observer = PollingObserver(timeout=WATCH_POLL_INTERVAL)
+    observer.schedule(handler, path=watch_dir, recursive=False)
+    observer.start()
+    return observer
 
 
 def main():
@@ -2236,34 +2923,67 @@ def main():
         logger.warning(f"Input file does not exist: {DJCAP_JSON_FILE}")
         logger.info("Waiting for file to be created...")
     
-    # Use watchdog if available, otherwise fall back to polling
-    if WATCHDOG_AVAILABLE:
+    # On Linux watch the directory with inotify directly: CLOSE_WRITE / MOVED_TO already
+    # fire once per completed write, so watchdog's event objects and debounce add nothing.
+    # watchdog covers the other platforms (FSEvents, kqueue, Windows); polling is the last resort.
+    inotify = None
+    if INOTIFY_AVAILABLE and sys.platform.startswith("linux"):
+        try:
+            inotify = INotify()
+            inotify.add_watch(os.path.dirname(DJCAP_JSON_FILE), inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+            logger.info("File watcher started (inotify). Press Ctrl+C to stop.")
+        except OSError as e:
+            logger.warning(f"inotify watch failed ({e}), trying watchdog")
+            if inotify is not None:
+                # INotify() succeeded and only add_watch failed; release the instance
+                inotify.close()
+            inotify = None
+
+    observer = None
+    if inotify is None and WATCHDOG_AVAILABLE:
         # #region agent log
         _debug_log("djcap_processor.py:main", "Using watchdog file watcher", {}, "K")
         # #endregion
         # Create file watcher
         event_handler = DjcapJsonHandler()
-        observer = Observer()
-        observer.schedule(event_handler, path=os.path.dirname(DJCAP_JSON_FILE), recursive=False)
-        observer.start()
-        logger.info("File watcher started (watchdog). Press Ctrl+C to stop.")
-    else:
+        observer = _start_observer(event_handler, os.path.dirname(event_handler._target_abs))
+        logger.info("File watcher started (watchdog, %s). Press Ctrl+C to stop.", type(observer).__name__)
+
+    if observer is None and inotify is None:
         # #region agent log
         _debug_log("djcap_processor.py:main", "Watchdog not available, using polling fallback", {}, "K")
         # #endregion
         logger.warning("watchdog library not available. Using polling fallback (checking every 2 seconds).")
         logger.warning("For better performance, install watchdog: pip install watchdog")
-        observer = None
     
     # Process initial file if it exists
     if os.path.exists(DJCAP_JSON_FILE):
         logger.info("Processing initial file...")
-        process_metadata_update(DJCAP_JSON_FILE)
+        if observer is not None:
+            # Same worker as watcher events, so the two can never run concurrently
+            event_handler.request_processing()
+        else:
+            # inotify queues events in the kernel meanwhile; polling has nothing to miss
+            process_metadata_update(DJCAP_JSON_FILE)
     
     # Keep running
     last_mtime = 0
+    target_name = os.path.basename(DJCAP_JSON_FILE)
     try:
+        if observer is not None:
+            # watchdog delivers events on its own thread; block until it exits.
+            # signal_handler raises SystemExit, which interrupts the join.
+            observer.join()
+            if RUNNING:
+                logger.error("File watcher thread exited unexpectedly")
+            return
         while RUNNING:
+            if inotify is not None:
+                # Blocks in the kernel until an event arrives (1s timeout to re-check RUNNING)
+                events = inotify.read(timeout=1000)
+                if any(event.name == target_name for event in events):
+                    process_metadata_update(DJCAP_JSON_FILE)
+                continue
             if observer is None:
                 # Polling mode: check file modification time
                 if os.path.exists(DJCAP_JSON_FILE):
@@ -2273,16 +2993,19 @@ def main():
                         _debug_log("djcap_processor.py:main:poll", "File changed detected via polling", {"last_mtime": last_mtime, "current_mtime": current_mtime}, "K")
                         # #endregion
                         last_mtime = current_mtime
-                        # Small delay to ensure atomic write is complete
-                        time.sleep(0.1)
+                        # Writers rename into place, so a changed mtime is a complete file
                         process_metadata_update(DJCAP_JSON_FILE)
-            time.sleep(1 if observer else 2)  # Poll every 2 seconds in polling mode
+            _STOP_EVENT.wait(2)  # Poll every 2 seconds in polling mode
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt")
     finally:
         if observer:
             observer.stop()
             observer.join()
+        if inotify is not None:
+            inotify.close()
+        # Let a queued output write land before exiting
+        _IO_EXEC.shutdown(wait=True)
         logger.info("DjCap Metadata Processor stopped.")
 
 
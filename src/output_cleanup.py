@@ -6,7 +6,6 @@ Automatically cleans the output folder when it grows too large.
 import json
 import logging
 import os
-from pathlib import Path
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
@@ -153,8 +152,8 @@ def cleanup_djcap_json(json_file: str) -> bool:
         with open(temp_file, 'w') as f:
             json.dump(cleaned_data, f, indent=2, ensure_ascii=False)
         
-        # Atomic rename
-        Path(temp_file).rename(json_file)
+        # Atomic replace (also overwrites an existing target on Windows)
+        os.replace(temp_file, json_file)
         
         old_size = get_file_size(json_file)
         new_size = get_file_size(json_file)
@@ -175,7 +174,7 @@ def cleanup_djcap_json(json_file: str) -> bool:
             temp_file = f"{json_file}.tmp"
             with open(temp_file, 'w') as f:
                 json.dump(minimal_data, f, indent=2, ensure_ascii=False)
-            Path(temp_file).rename(json_file)
+            os.replace(temp_file, json_file)
             logger.info(f"Created minimal valid JSON file after corruption")
             return True
         except Exception as e2: